@@ -4,6 +4,7 @@ from .makelive import (
     is_live_photo_pair,
     live_id,
     make_live_photo,
+    make_live_photos,
     save_live_photo_pair_as_pvt,
 )
 from .version import __version__
@@ -13,5 +14,6 @@ __all__ = [
     "is_live_photo_pair",
     "live_id",
     "make_live_photo",
+    "make_live_photos",
     "save_live_photo_pair_as_pvt",
 ]
@@ -2,13 +2,19 @@
 
 from __future__ import annotations
 
+import concurrent.futures
+import itertools
 import os
 import pathlib
+from collections import defaultdict
 from collections.abc import Iterable
 
 import click
+import objc
 
 from .makelive import (
+    IMAGE_EXTENSIONS,
+    VIDEO_EXTENSIONS,
     is_image_file,
     is_live_photo_pair,
     is_video_file,
@@ -22,36 +28,49 @@ def find_photo_video_pairs(
     file_paths: Iterable[str | os.PathLike],
 ) -> tuple[list[tuple[pathlib.Path, pathlib.Path]], list[pathlib.Path]]:  # noqa: E501 (line too long
     """Find photo and video pairs in a list of file paths."""
-    matched_files, unmatched_files, image_files, video_files = [], [], {}, {}
+    matched_files, unmatched_files = [], []
+    # group files by stem: {stem: {"image": path, "video": path}}
+    groups: defaultdict[str, dict[str, pathlib.Path]] = defaultdict(dict)
 
     for fp in file_paths:
         file_path = pathlib.Path(fp)
-        file_stem = file_path.stem
-        if is_image_file(file_path):
-            image_files[file_stem] = file_path.resolve()
-        elif is_video_file(file_path):
-            video_files[file_stem] = file_path.resolve()
-
-    for key, image_file in image_files.items():
-        if key in video_files:
-            matched_files.append((image_file, video_files[key]))
-            del video_files[key]
+        suffix = file_path.suffix.lower()
+        if suffix in IMAGE_EXTENSIONS:
+            groups[file_path.stem]["image"] = file_path
+        elif suffix in VIDEO_EXTENSIONS:
+            groups[file_path.stem]["video"] = file_path
+
+    for group in groups.values():
+        if "image" in group and "video" in group:
+            matched_files.append((group["image"], group["video"]))
         else:
-            unmatched_files.append(image_file)
-
-    unmatched_files.extend(video_files.values())
+            unmatched_files.extend(group.values())
 
     return matched_files, unmatched_files
 
 
 def check_pair(image: pathlib.Path, video: pathlib.Path):
     """Check if a photo and video pair is a Live Photo."""
-    if check_id := is_live_photo_pair(image, video):
+    with objc.autorelease_pool():
+        check_id = is_live_photo_pair(image, video)
+    if check_id:
         click.echo(f"{image} and {video} are Live Photos: {check_id}")
     else:
         click.echo(f"{image} and {video} are not Live Photos")
 
 
+def make_live_pair(image: pathlib.Path, video: pathlib.Path, pvt: bool) -> tuple[str, pathlib.Path | None]:
+    """Make a photo and video pair a Live Photo, optionally saving it as a .pvt package.
+
+    Returns: tuple of asset ID, path to the .pvt package or None if pvt is False.
+    """
+    # drain the Objective-C objects created for each pair so memory does not grow across a batch
+    with objc.autorelease_pool():
+        if pvt:
+            return save_live_photo_pair_as_pvt(image, video)
+        return make_live_photo(image, video), None
+
+
 @click.command()
 @click.version_option(version=__version__)
 @click.option(
@@ -83,6 +102,14 @@ def check_pair(image: pathlib.Path, video: pathlib.Path):
     type=click.Path(exists=True, path_type=pathlib.Path),
     help="Specify image and video files manually",
 )
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=1),
+    default=os.cpu_count() or 1,
+    show_default=True,
+    help="Number of photo and video pairs to process in parallel.",
+)
 @click.argument(
     "files",
     nargs=-1,
@@ -93,6 +120,7 @@ def main(
     verbose: bool,
     pvt: bool,
     manual: tuple[tuple[pathlib.Path, pathlib.Path]],
+    jobs: int,
     files: tuple[pathlib.Path, ...],
 ):
     """MakeLive: convert a photo (JPEG or HEIC) and video (MOV or MP4) pair to a Live Photo.
@@ -100,9 +128,9 @@ def main(
     This will add the necessary metadata for Apple Photos to recognize the
     photo and video pair as a Live Photo when imported to Photos.
 
-    Note: This will modify the image and video files in place and will result in
-    loss of any XMP metadata stored in the video file. Ensure you have a backup
-    if you need to preserve the original files.
+    Note: This will modify the image and video files in place and may result in
+    loss of any XMP metadata stored in the video file if the video must be
+    re-exported. Ensure you have a backup if you need to preserve the original files.
 
     MakeLive will attempt to find photo and video pairs in the FILES argument.
     Alternatively, you can specify the photo and video files manually using the
@@ -114,10 +142,10 @@ def main(
     # if no files are passed (either via manual or files), print help and exit
     if not manual and not files:
         click.echo("No files specified", err=True)
-        click.echo(main.get_help(click.Context(main)))
+        click.echo(click.get_current_context().get_help())
         raise click.Abort()
 
-    # process manual files first
+    # validate manual files before modifying any files
     for image, video in manual:
         if not is_image_file(image):
             click.echo(f"{image} is not a JPEG or HEIC image", err=True)
@@ -125,33 +153,43 @@ def main(
         if not is_video_file(video):
             click.echo(f"{video} is not a QuickTime movie file", err=True)
             raise click.Abort()
-        if check:
-            check_pair(image, video)
-        else:
-            if pvt:
-                asset_id, pvt_file = save_live_photo_pair_as_pvt(image, video)
-            else:
-                asset_id = make_live_photo(image, video)
-            if verbose:
-                click.echo(f"Wrote asset ID: {asset_id} to {image} and {video}")
-                if pvt:
-                    click.echo(f"Saved {image} and {video} to {pvt_file}")
-
-    # process any files passed via FILES argument
+
     matched_files, unmatched_files = find_photo_video_pairs(files)
 
-    for image, video in matched_files:
-        if check:
+    # manual pairs are processed first, followed by any pairs found in FILES
+    pairs = list(itertools.chain(manual, matched_files))
+    if manual:
+        # find_photo_video_pairs groups FILES by stem so duplicates only come from mixing --manual and FILES;
+        # process a pair given more than once only once
+        unique_pairs = {}
+        for image, video in pairs:
+            unique_pairs.setdefault((image.resolve(), video.resolve()), (image, video))
+        pairs = list(unique_pairs.values())
+
+    if check:
+        for image, video in pairs:
             check_pair(image, video)
-        else:
-            if pvt:
-                asset_id, pvt_file = save_live_photo_pair_as_pvt(image, video)
-            else:
-                asset_id = make_live_photo(image, video)
-            if verbose:
-                click.echo(f"Wrote asset ID: {asset_id} to {image} and {video}")
-                if pvt:
-                    click.echo(f"Saved {image} and {video} to {pvt_file}")
+    else:
+        # each pair is independent so process them in separate processes; the metadata is
+        # edited in pure Python which holds the GIL so threads would not help
+        images = [image for image, _ in pairs]
+        videos = [video for _, video in pairs]
+        pvts = [pvt] * len(pairs)
+        workers = min(jobs, len(pairs))
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        try:
+            results = (
+                executor.map(make_live_pair, images, videos, pvts) if executor else map(make_live_pair, images, videos, pvts)
+            )
+            for image, video, (asset_id, pvt_file) in zip(images, videos, results):
+                if verbose:
+                    click.echo(f"Wrote asset ID: {asset_id} to {image} and {video}")
+                    if pvt:
+                        click.echo(f"Saved {image} and {video} to {pvt_file}")
+        finally:
+            if executor:
+                executor.shutdown()
+
     for file in unmatched_files:
         click.echo(f"No matching file pair found for {file}", err=True)
 
@@ -0,0 +1,523 @@
+"""Read and write the Live Photo asset id in the Apple MakerNote of a JPEG or HEIC image without re-encoding the image
+
+The functions in this module read and edit the EXIF (TIFF) block of the file directly and leave the
+compressed image data byte-for-byte identical. Only files that already contain an EXIF block
+are supported; callers should fall back to Core Graphics if ExifError is raised.
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import struct
+from collections.abc import Iterator
+from typing import BinaryIO
+
+from .fileutil import atomic_replace
+
+# TIFF tags
+TAG_EXIF_IFD = 0x8769
+TAG_MAKER_NOTE = 0x927C
+
+# key in the Apple MakerNote used to store the asset ID (exiftool reports this as MakerNote:ContentIdentifier)
+TAG_APPLE_ASSET_IDENTIFIER = 0x0011
+
+# TIFF field types
+TYPE_ASCII = 2
+TYPE_UNDEFINED = 7
+
+# size in bytes of each TIFF field type
+TYPE_SIZES = {1: 1, 2: 1, 3: 2, 4: 4, 5: 8, 6: 1, 7: 1, 8: 2, 9: 4, 10: 8, 11: 4, 12: 8, 13: 4}
+
+# Apple MakerNote header: "Apple iOS\0" + version (1) + byte order;
+# offsets in the MakerNote are relative to the start of this header
+APPLE_MAKERNOTE_HEADER = b"Apple iOS\x00\x00\x01MM"
+APPLE_MAKERNOTE_IFD_OFFSET = len(APPLE_MAKERNOTE_HEADER)
+
+EXIF_HEADER = b"Exif\x00\x00"
+
+# JPEG markers
+JPEG_SOI = b"\xff\xd8"
+JPEG_APP1 = 0xE1
+JPEG_SOS = 0xDA
+JPEG_MAX_SEGMENT_SIZE = 0xFFFF
+
+COPY_BUFFER_SIZE = 1024 * 1024
+
+
+class ExifError(ValueError):
+    """Raised when the EXIF block of an image cannot be read or updated"""
+
+
+# An IFD entry is (tag, type, count, value); values of 4 bytes or less are stored in the entry,
+# larger values are stored after the IFD by _pack_ifd
+IFDEntry = tuple[int, int, int, bytes]
+
+
+### TIFF helpers ###
+
+
+def _unpack_from(fmt: str, data: bytes, offset: int) -> tuple:
+    """struct.unpack_from that raises ExifError instead of struct.error"""
+    try:
+        return struct.unpack_from(fmt, data, offset)
+    except struct.error as e:
+        raise ExifError(f"Truncated EXIF data at offset {offset}") from e
+
+
+def _unpack_uint(data: bytes, offset: int, size: int) -> int:
+    """Return the big-endian unsigned integer of size bytes at offset in data or raise ExifError if truncated"""
+    if offset + size > len(data):
+        raise ExifError(f"Truncated EXIF data at offset {offset}")
+    return int.from_bytes(data[offset : offset + size], "big")
+
+
+def _read_ifd(data: bytes, offset: int, endian: str) -> tuple[list[tuple[int, int, int, bytes]], int]:
+    """Read the IFD at offset in data
+
+    Returns: tuple of list of (tag, type, count, raw 4 byte value/offset field), offset of next IFD
+    """
+    (count,) = _unpack_from(f"{endian}H", data, offset)
+    entries = []
+    for i in range(count):
+        tag, field_type, field_count = _unpack_from(f"{endian}HHI", data, offset + 2 + 12 * i)
+        raw = data[offset + 10 + 12 * i : offset + 14 + 12 * i]
+        entries.append((tag, field_type, field_count, raw))
+    (next_ifd,) = _unpack_from(f"{endian}I", data, offset + 2 + 12 * count)
+    return entries, next_ifd
+
+
+def _entry_value(data: bytes, entry: tuple[int, int, int, bytes], endian: str) -> bytes:
+    """Return the value bytes of an IFD entry; out of line values are relative to the start of data"""
+    _, field_type, count, raw = entry
+    try:
+        size = TYPE_SIZES[field_type] * count
+    except KeyError as e:
+        raise ExifError(f"Unknown TIFF field type {field_type}") from e
+    if size <= 4:
+        return raw[:size]
+    (offset,) = _unpack_from(f"{endian}I", raw, 0)
+    if offset + size > len(data):
+        raise ExifError(f"EXIF value at offset {offset} extends past end of data")
+    return data[offset : offset + size]
+
+
+def _pack_ifd(entries: list[IFDEntry], offset: int, endian: str) -> bytes:
+    """Serialize an IFD that will be located at offset; values larger than 4 bytes are written after the IFD"""
+    entries = sorted(entries, key=lambda entry: entry[0])
+    data_offset = offset + 2 + 12 * len(entries) + 4
+    ifd = bytearray(struct.pack(f"{endian}H", len(entries)))
+    value_data = bytearray()
+    for tag, field_type, count, value in entries:
+        ifd += struct.pack(f"{endian}HHI", tag, field_type, count)
+        if len(value) <= 4:
+            ifd += value.ljust(4, b"\x00")
+        else:
+            ifd += struct.pack(f"{endian}I", data_offset + len(value_data))
+            value_data += value
+            if len(value_data) % 2:
+                value_data += b"\x00"
+    ifd += struct.pack(f"{endian}I", 0)
+    return bytes(ifd + value_data)
+
+
+def _tiff_byte_order(tiff: bytes) -> str:
+    """Return the struct byte order character for a TIFF header"""
+    if tiff[:4] == b"MM\x00\x2a":
+        return ">"
+    if tiff[:4] == b"II\x2a\x00":
+        return "<"
+    raise ExifError("Invalid TIFF header")
+
+
+def _apple_makernote_with_asset_id(makernote: bytes | None, asset_id: str) -> bytes:
+    """Return a new Apple MakerNote with the asset id set, preserving any other tags in makernote"""
+    value = asset_id.encode("utf-8") + b"\x00"
+    entries: list[IFDEntry] = []
+    if makernote is not None:
+        endian = ">" if makernote[12:14] == b"MM" else "<"
+        ifd, _ = _read_ifd(makernote, APPLE_MAKERNOTE_IFD_OFFSET, endian)
+        entries = [
+            (tag, field_type, count, _entry_value(makernote, (tag, field_type, count, raw), endian))
+            for tag, field_type, count, raw in ifd
+            if tag != TAG_APPLE_ASSET_IDENTIFIER
+        ]
+        header = makernote[:APPLE_MAKERNOTE_IFD_OFFSET]
+    else:
+        endian = ">"
+        header = APPLE_MAKERNOTE_HEADER
+    entries.append((TAG_APPLE_ASSET_IDENTIFIER, TYPE_ASCII, len(value), value))
+    return header + _pack_ifd(entries, APPLE_MAKERNOTE_IFD_OFFSET, endian)
+
+
+def _exif_ifd_pointer(tiff: bytes, endian: str) -> tuple[int, int] | None:
+    """Return tuple of offset of the EXIF IFD pointer value in IFD0, offset of the EXIF IFD or None if not found"""
+    (ifd0_offset,) = _unpack_from(f"{endian}I", tiff, 4)
+    ifd0, _ = _read_ifd(tiff, ifd0_offset, endian)
+    for index, (tag, _, _, raw) in enumerate(ifd0):
+        if tag == TAG_EXIF_IFD:
+            return ifd0_offset + 2 + 12 * index + 8, _unpack_from(f"{endian}I", raw, 0)[0]
+    return None
+
+
+def _makernote(tiff: bytes, exif_ifd: list[tuple[int, int, int, bytes]], endian: str) -> tuple[bytes, int] | None:
+    """Return tuple of MakerNote bytes, offset of MakerNote in tiff or None if the EXIF IFD has no MakerNote"""
+    for entry in exif_ifd:
+        if entry[0] == TAG_MAKER_NOTE:
+            makernote = _entry_value(tiff, entry, endian)
+            offset = _unpack_from(f"{endian}I", entry[3], 0)[0] if len(makernote) > 4 else 0
+            return makernote, offset
+    return None
+
+
+def asset_id_from_tiff(tiff: bytes) -> str | None:
+    """Return the asset id stored in the Apple MakerNote of the TIFF (EXIF) block or None if not present
+
+    Raises:
+        ExifError: If the TIFF block could not be parsed.
+    """
+    endian = _tiff_byte_order(tiff)
+    exif_pointer = _exif_ifd_pointer(tiff, endian)
+    if exif_pointer is None:
+        return None
+    exif_ifd, _ = _read_ifd(tiff, exif_pointer[1], endian)
+    found = _makernote(tiff, exif_ifd, endian)
+    if not found or not found[0].startswith(APPLE_MAKERNOTE_HEADER[:10]):
+        return None
+    makernote = found[0]
+    makernote_endian = ">" if makernote[12:14] == b"MM" else "<"
+    ifd, _ = _read_ifd(makernote, APPLE_MAKERNOTE_IFD_OFFSET, makernote_endian)
+    for entry in ifd:
+        if entry[0] == TAG_APPLE_ASSET_IDENTIFIER:
+            value = _entry_value(makernote, entry, makernote_endian).split(b"\x00", 1)[0]
+            return value.decode("utf-8", errors="replace") or None
+    return None
+
+
+def tiff_with_asset_id(tiff: bytes, asset_id: str) -> bytes:
+    """Return a copy of the TIFF (EXIF) block with the asset id written to the Apple MakerNote
+
+    Args:
+        tiff: The TIFF block starting with the TIFF header.
+        asset_id: The asset id to write.
+
+    Returns: The updated TIFF block.
+
+    Raises:
+        ExifError: If the TIFF block has no EXIF IFD or contains a MakerNote that is not an Apple MakerNote.
+
+    Note:
+        Existing data is never moved so that all offsets in the TIFF block remain valid. If the new
+        MakerNote fits in the space used by the existing one it is written in place, otherwise the
+        MakerNote and a copy of the EXIF IFD are appended to the end of the block.
+    """
+    endian = _tiff_byte_order(tiff)
+    exif_pointer = _exif_ifd_pointer(tiff, endian)
+    if exif_pointer is None:
+        raise ExifError("No EXIF IFD found")
+    exif_pointer_offset, exif_offset = exif_pointer
+
+    exif_ifd, _ = _read_ifd(tiff, exif_offset, endian)
+    makernote = None
+    if found := _makernote(tiff, exif_ifd, endian):
+        makernote, makernote_offset = found
+        if not makernote.startswith(APPLE_MAKERNOTE_HEADER[:10]):
+            raise ExifError("MakerNote is not an Apple MakerNote")
+
+    new_makernote = _apple_makernote_with_asset_id(makernote, asset_id)
+    if makernote is not None and len(new_makernote) <= len(makernote):
+        new_makernote = new_makernote.ljust(len(makernote), b"\x00")
+        return tiff[:makernote_offset] + new_makernote + tiff[makernote_offset + len(makernote) :]
+
+    new_tiff = bytearray(tiff)
+    if len(new_tiff) % 2:
+        new_tiff += b"\x00"
+    makernote_offset = len(new_tiff)
+    new_tiff += new_makernote
+    if len(new_tiff) % 2:
+        new_tiff += b"\x00"
+    exif_entries = [entry for entry in exif_ifd if entry[0] != TAG_MAKER_NOTE]
+    exif_entries.append((TAG_MAKER_NOTE, TYPE_UNDEFINED, len(new_makernote), struct.pack(f"{endian}I", makernote_offset)))
+    exif_offset = len(new_tiff)
+    new_tiff += _pack_ifd(exif_entries, exif_offset, endian)
+    struct.pack_into(f"{endian}I", new_tiff, exif_pointer_offset, exif_offset)
+    return bytes(new_tiff)
+
+
+### File helpers ###
+
+
+def _read_exact(file: BinaryIO, size: int) -> bytes:
+    """Read exactly size bytes from file or raise ExifError"""
+    data = file.read(size)
+    if len(data) != size:
+        raise ExifError("Unexpected end of file")
+    return data
+
+
+### JPEG ###
+
+
+def _find_jpeg_exif_segment(file: BinaryIO) -> tuple[int, bytes]:
+    """Find the EXIF APP1 segment in a JPEG file
+
+    Returns: tuple of offset of the segment, segment payload (excluding marker and length);
+        file is positioned at the end of the segment.
+    """
+    if file.read(2) != JPEG_SOI:
+        raise ExifError("Not a JPEG file")
+    while True:
+        offset = file.tell()
+        marker = _read_exact(file, 2)
+        if marker[0] != 0xFF:
+            raise ExifError(f"Invalid JPEG marker at offset {offset}")
+        if marker[1] == JPEG_SOS:
+            raise ExifError("No EXIF segment found")
+        (length,) = struct.unpack(">H", _read_exact(file, 2))
+        if length < 2:
+            raise ExifError(f"Invalid JPEG segment length at offset {offset}")
+        # only read the payload of APP1 segments with an EXIF header; seek past all other segments
+        if marker[1] == JPEG_APP1 and length >= 2 + len(EXIF_HEADER):
+            header = _read_exact(file, len(EXIF_HEADER))
+            if header == EXIF_HEADER:
+                return offset, header + _read_exact(file, length - 2 - len(EXIF_HEADER))
+        file.seek(offset + 2 + length)
+
+
+def write_asset_id_to_jpeg(filepath: str | os.PathLike, asset_id: str) -> None:
+    """Write the asset id to the Apple MakerNote of a JPEG file without re-encoding the image
+
+    Args:
+        filepath: Path to the JPEG file.
+        asset_id: The asset id to write.
+
+    Raises:
+        ExifError: If the EXIF data could not be updated.
+    """
+    with open(filepath, "rb") as src:
+        segment_offset, payload = _find_jpeg_exif_segment(src)
+        segment_end = src.tell()
+        tiff = tiff_with_asset_id(payload[len(EXIF_HEADER) :], asset_id)
+        length = 2 + len(EXIF_HEADER) + len(tiff)
+        if length > JPEG_MAX_SEGMENT_SIZE:
+            raise ExifError("EXIF data too large for JPEG APP1 segment")
+        with atomic_replace(filepath) as temp_path, open(temp_path, "wb") as dst:
+            src.seek(0)
+            dst.write(_read_exact(src, segment_offset))
+            dst.write(struct.pack(">BBH", 0xFF, JPEG_APP1, length) + EXIF_HEADER + tiff)
+            src.seek(segment_end)
+            shutil.copyfileobj(src, dst, COPY_BUFFER_SIZE)
+
+
+### HEIC ###
+
+
+def _iter_boxes(data: bytes, start: int, end: int) -> Iterator[tuple[bytes, int, int]]:
+    """Iterate over ISO BMFF boxes in data[start:end]
+
+    Yields: tuple of box type, offset of box payload, offset of end of box
+    """
+    offset = start
+    while offset + 8 <= end:
+        size, box_type = _unpack_from(">I4s", data, offset)
+        header_size = 8
+        if size == 1:
+            (size,) = _unpack_from(">Q", data, offset + 8)
+            header_size = 16
+        elif size == 0:
+            size = end - offset
+        if size < header_size or offset + size > end:
+            raise ExifError(f"Invalid box size at offset {offset}")
+        yield box_type, offset + header_size, offset + size
+        offset += size
+
+
+def _read_heic_meta(file: BinaryIO) -> tuple[int, bytes]:
+    """Return the file offset of the payload of the top level meta box and the payload"""
+    while True:
+        offset = file.tell()
+        header = file.read(8)
+        if len(header) < 8:
+            raise ExifError("No meta box found")
+        size, box_type = struct.unpack(">I4s", header)
+        header_size = 8
+        if size == 1:
+            (size,) = struct.unpack(">Q", _read_exact(file, 8))
+            header_size = 16
+        elif size == 0 and box_type != b"meta":
+            raise ExifError("No meta box found")
+        if box_type == b"meta":
+            payload = file.read() if size == 0 else _read_exact(file, size - header_size)
+            return offset + header_size, payload
+        if size < header_size:
+            raise ExifError(f"Invalid box size at offset {offset}")
+        file.seek(offset + size)
+
+
+def _heic_exif_item_id(meta: bytes) -> int:
+    """Return the item ID of the Exif item from the payload of the meta box"""
+    for box_type, start, end in _iter_boxes(meta, 4, len(meta)):
+        if box_type != b"iinf":
+            continue
+        version = _unpack_uint(meta, start, 1)
+        entries_start = start + (6 if version == 0 else 8)
+        for infe_type, infe_start, _ in _iter_boxes(meta, entries_start, end):
+            infe_version = _unpack_uint(meta, infe_start, 1)
+            if infe_type != b"infe" or infe_version < 2:
+                continue
+            if infe_version == 2:
+                item_id, _, item_type = _unpack_from(">HH4s", meta, infe_start + 4)
+            else:
+                item_id, _, item_type = _unpack_from(">IH4s", meta, infe_start + 4)
+            if item_type == b"Exif":
+                return item_id
+    raise ExifError("No Exif item found")
+
+
+def _heic_item_location(meta: bytes, item_id: int) -> tuple[int, int, int, int, int, int, int]:
+    """Find the location of an item in the iloc box of the meta box payload
+
+    Returns: tuple of base offset, offset of extent_offset field in meta, size of extent_offset field,
+        offset of extent_length field in meta, size of extent_length field, extent offset, extent length
+    """
+    for box_type, start, _ in _iter_boxes(meta, 4, len(meta)):
+        if box_type != b"iloc":
+            continue
+        version = _unpack_uint(meta, start, 1)
+        sizes = _unpack_uint(meta, start + 4, 2)
+        offset_size, length_size = sizes >> 12, (sizes >> 8) & 0x0F
+        base_offset_size, index_size = (sizes >> 4) & 0x0F, sizes & 0x0F
+        if version < 1:
+            index_size = 0
+        pos = start + 6
+        id_fmt = ">H" if version < 2 else ">I"
+        (item_count,) = _unpack_from(id_fmt, meta, pos)
+        pos += struct.calcsize(id_fmt)
+        for _ in range(item_count):
+            (current_id,) = _unpack_from(id_fmt, meta, pos)
+            pos += struct.calcsize(id_fmt)
+            construction_method = 0
+            if version >= 1:
+                construction_method = _unpack_from(">H", meta, pos)[0] & 0x0F
+                pos += 2
+            (data_reference_index,) = _unpack_from(">H", meta, pos)
+            base_offset = _unpack_uint(meta, pos + 2, base_offset_size)
+            pos += 2 + base_offset_size
+            (extent_count,) = _unpack_from(">H", meta, pos)
+            pos += 2
+            if current_id == item_id:
+                if construction_method != 0 or data_reference_index != 0 or extent_count != 1:
+                    raise ExifError("Unsupported Exif item location")
+                if offset_size < 4 or length_size < 4:
+                    raise ExifError("Unsupported Exif item location")
+                offset_pos = pos + index_size
+                length_pos = offset_pos + offset_size
+                extent_offset = _unpack_uint(meta, offset_pos, offset_size)
+                extent_length = _unpack_uint(meta, length_pos, length_size)
+                return base_offset, offset_pos, offset_size, length_pos, length_size, base_offset + extent_offset, extent_length
+            pos += extent_count * (index_size + offset_size + length_size)
+    raise ExifError("No location found for Exif item")
+
+
+def _heic_exif_tiff_start(exif: bytes) -> int:
+    """Return the offset of the TIFF header in the Exif item"""
+    # the Exif item starts with the offset to the TIFF header (usually preceded by "Exif\0\0")
+    (tiff_start,) = _unpack_from(">I", exif, 0)
+    return tiff_start + 4
+
+
+def _read_heic_exif(file: BinaryIO) -> bytes:
+    """Return the TIFF block of the Exif item in a HEIC file"""
+    _, meta = _read_heic_meta(file)
+    location = _heic_item_location(meta, _heic_exif_item_id(meta))
+    file.seek(location[5])
+    exif = _read_exact(file, location[6])
+    return exif[_heic_exif_tiff_start(exif) :]
+
+
+def write_asset_id_to_heic(filepath: str | os.PathLike, asset_id: str) -> None:
+    """Write the asset id to the Apple MakerNote of a HEIC file without re-encoding the image
+
+    Args:
+        filepath: Path to the HEIC file.
+        asset_id: The asset id to write.
+
+    Raises:
+        ExifError: If the EXIF data could not be updated.
+
+    Note:
+        If the updated Exif item does not fit in the space used by the existing item, it is written
+        to a new mdat box at the end of the file and the item location is updated to point to it.
+    """
+    with open(filepath, "rb") as src:
+        meta_offset, meta = _read_heic_meta(src)
+        item_id = _heic_exif_item_id(meta)
+        base_offset, offset_pos, offset_size, length_pos, length_size, exif_offset, exif_length = _heic_item_location(
+            meta, item_id
+        )
+        src.seek(exif_offset)
+        exif = _read_exact(src, exif_length)
+
+    tiff_start = _heic_exif_tiff_start(exif)
+    tiff = tiff_with_asset_id(exif[tiff_start:], asset_id)
+    new_exif = exif[:tiff_start] + tiff
+    in_place = len(new_exif) <= exif_length
+    new_offset = os.path.getsize(filepath) + 8 - base_offset
+    if not in_place and (new_offset >= 1 << (8 * offset_size) or len(new_exif) >= 1 << (8 * length_size)):
+        raise ExifError("Exif item location too large for iloc box")
+
+    with atomic_replace(filepath, clone=True) as temp_path, open(temp_path, "r+b") as dst:
+        if in_place:
+            dst.seek(exif_offset)
+            dst.write(new_exif.ljust(exif_length, b"\x00"))
+            return
+        dst.seek(0, os.SEEK_END)
+        dst.write(struct.pack(">I4s", 8 + len(new_exif), b"mdat") + new_exif)
+        dst.seek(meta_offset + offset_pos)
+        dst.write(new_offset.to_bytes(offset_size, "big"))
+        dst.seek(meta_offset + length_pos)
+        dst.write(len(new_exif).to_bytes(length_size, "big"))
+
+
+def read_asset_id_from_image(filepath: str | os.PathLike) -> str | None:
+    """Read the asset id from the Apple MakerNote of a JPEG or HEIC file
+
+    Args:
+        filepath: Path to the JPEG or HEIC file.
+
+    Returns: The asset id or None if the EXIF block has no asset id.
+
+    Raises:
+        ExifError: If the file is not a JPEG or HEIC file or the EXIF block could not be found or read.
+    """
+    with open(filepath, "rb") as file:
+        header = file.read(12)
+        file.seek(0)
+        if header.startswith(JPEG_SOI):
+            _, payload = _find_jpeg_exif_segment(file)
+            tiff = payload[len(EXIF_HEADER) :]
+        elif header[4:8] == b"ftyp":
+            tiff = _read_heic_exif(file)
+        else:
+            raise ExifError(f"{filepath} is not a JPEG or HEIC file")
+    return asset_id_from_tiff(tiff)
+
+
+def write_asset_id_to_image(filepath: str | os.PathLike, asset_id: str) -> None:
+    """Write the asset id to the Apple MakerNote of a JPEG or HEIC file without re-encoding the image
+
+    Args:
+        filepath: Path to the JPEG or HEIC file.
+        asset_id: The asset id to write.
+
+    Raises:
+        ExifError: If the file is not a JPEG or HEIC file or the EXIF data could not be updated.
+    """
+    with open(filepath, "rb") as file:
+        header = file.read(12)
+    if header.startswith(JPEG_SOI):
+        write_asset_id_to_jpeg(filepath, asset_id)
+    elif header[4:8] == b"ftyp":
+        write_asset_id_to_heic(filepath, asset_id)
+    else:
+        raise ExifError(f"{filepath} is not a JPEG or HEIC file")
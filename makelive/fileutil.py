@@ -0,0 +1,62 @@
+"""File helpers shared by the image, movie, and .pvt package writers"""
+
+from __future__ import annotations
+
+import contextlib
+import ctypes
+import functools
+import os
+import shutil
+import tempfile
+from collections.abc import Callable, Iterator
+
+
+@functools.cache
+def _clonefile() -> Callable[[bytes, bytes, int], int] | None:
+    """Return the clonefile(2) function from libSystem or None if it is not available"""
+    try:
+        libsystem = ctypes.CDLL("/usr/lib/libSystem.dylib", use_errno=True)
+        clonefile = libsystem.clonefile
+    except (OSError, AttributeError):
+        return None
+    clonefile.argtypes = [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_uint32]
+    clonefile.restype = ctypes.c_int
+    return clonefile
+
+
+def clone_or_copy(src: str | os.PathLike, dst: str | os.PathLike) -> None:
+    """Copy src to dst, as a copy-on-write clone if the file system supports it (e.g. APFS)
+
+    A clone takes the same time regardless of file size and uses no additional disk space until the
+    copy is modified; if the file cannot be cloned (for example, dst already exists or the file system
+    does not support clones), the file is copied with shutil.copy.
+    """
+    clonefile = _clonefile()
+    if clonefile and clonefile(os.fsencode(src), os.fsencode(dst), 0) == 0:
+        return
+    shutil.copy(src, dst)
+
+
+@contextlib.contextmanager
+def atomic_replace(filepath: str | os.PathLike, clone: bool = False) -> Iterator[str]:
+    """Yield a temporary path in the same directory as filepath which replaces (or creates) filepath on success
+
+    If clone is True, the temporary file starts as a copy of filepath made with clone_or_copy so it can be
+    edited in place; otherwise it starts empty.
+    """
+    filepath = os.fspath(filepath)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(filepath) or ".", prefix=f".{os.path.basename(filepath)}.")
+    os.close(fd)
+    try:
+        if clone:
+            # clonefile does not overwrite an existing file so remove the empty file created by mkstemp
+            os.unlink(temp_path)
+            clone_or_copy(filepath, temp_path)
+        yield temp_path
+        if os.path.exists(filepath):
+            shutil.copymode(filepath, temp_path)
+        os.replace(temp_path, filepath)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(temp_path)
+        raise
@@ -2,24 +2,30 @@
 
 from __future__ import annotations
 
+import concurrent.futures
+import contextlib
+import functools
 import os
 import pathlib
+import plistlib
 import shutil
-import threading
+import sys
 import uuid
+from collections.abc import Callable, Iterable, Iterator
+from typing import TYPE_CHECKING, Any
 
-import AVFoundation
-import cgmetadata
 import objc
-import Quartz
-from Foundation import (
-    NSURL,
-    CFDictionaryRef,
-    NSData,
-    NSMutableData,
-    NSMutableDictionary,
-)
-from wurlitzer import pipes
+
+# AVFoundation, Quartz, and Foundation are slow to import so are imported only in the functions that use them
+if TYPE_CHECKING:
+    import AVFoundation
+    import Foundation
+    import Quartz
+    from Foundation import CFDictionaryRef
+
+from .exif import ExifError, read_asset_id_from_image, write_asset_id_to_image
+from .fileutil import atomic_replace, clone_or_copy
+from .quicktime import QuickTimeError, read_asset_id_from_quicktime, write_asset_id_to_quicktime
 
 # Constants
 # key for the MakerApple dictionary in the image metadata to store the asset ID
@@ -30,6 +36,61 @@ kFigAppleMakerNote_AssetIdentifier = "17"
 kKeyContentIdentifier = "com.apple.quicktime.content.identifier"
 kKeySpaceQuickTimeMetadata = "mdta"
 
+# data type for the asset ID in the QuickTime movie metadata
+kDataTypeUTF8 = "com.apple.metadata.datatype.UTF-8"
+
+# contents of the metadata.plist file in a .pvt package
+PVT_METADATA = {"PFVideoComplementMetadataVersionKey": "1"}
+
+# supported file extensions (lower case)
+IMAGE_EXTENSIONS = frozenset({".jpg", ".jpeg", ".heic", ".heif"})
+VIDEO_EXTENSIONS = frozenset({".mov", ".mp4"})
+
+### Utility functions ###
+
+
+@functools.cache
+def _nsstring(value: str) -> Foundation.NSString:
+    """Return an NSString for a constant string, created once and reused for every call into Objective-C"""
+    from Foundation import NSString
+
+    return NSString.stringWithString_(value)
+
+
+def _call_in_autorelease_pool(func: Callable[..., Any], *args: Any) -> Any:
+    """Call func with args in a new autorelease pool so the Objective-C objects it creates are released on return"""
+    with objc.autorelease_pool():
+        return func(*args)
+
+
+@contextlib.contextmanager
+def suppress_stderr() -> Iterator[None]:
+    """Redirect the stderr file descriptor to /dev/null to hide messages written by the system frameworks
+
+    Set the environment variable MAKELIVE_SUPPRESS_AVEBRIDGE=0 to leave stderr alone, e.g. when debugging.
+    """
+    if os.environ.get("MAKELIVE_SUPPRESS_AVEBRIDGE", "1") == "0":
+        yield
+        return
+    sys.stderr.flush()
+    saved_fd = os.dup(2)
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 2)
+    os.close(devnull)
+    try:
+        yield
+    finally:
+        sys.stderr.flush()
+        os.dup2(saved_fd, 2)
+        os.close(saved_fd)
+
+
+def new_asset_id() -> str:
+    """Return a new unique asset id as an upper case UUID string"""
+    # format the UUID fields directly instead of formatting then upper casing the string
+    return "{:08X}-{:04X}-{:04X}-{:02X}{:02X}-{:012X}".format(*uuid.uuid4().fields)
+
+
 ### Functions for adding asset id to image file ###
 
 
@@ -46,12 +107,14 @@ def image_source_from_path(
     Raises:
         ValueError: If the image source could not be created.
     """
-    with objc.autorelease_pool():
-        image_url = NSURL.fileURLWithPath_(str(image_path))
-        image_source = Quartz.CGImageSourceCreateWithURL(image_url, None)
-        if not image_source:
-            raise ValueError(f"Could not create image source for {image_path}")
-        return image_source
+    import Quartz
+    from Foundation import NSURL
+
+    image_url = NSURL.fileURLWithPath_(str(image_path))
+    image_source = Quartz.CGImageSourceCreateWithURL(image_url, None)
+    if not image_source:
+        raise ValueError(f"Could not create image source for {image_path}")
+    return image_source
 
 
 def write_image_with_metadata(
@@ -71,16 +134,20 @@ def write_image_with_metadata(
 
     Raises:
         ValueError: If the image destination could not be created.
+        OSError: If the image could not be written to destination_path.
     """
-    destination_path = str(destination_path)
-    with objc.autorelease_pool():
+    import Quartz
+    from Foundation import NSURL
+
+    with atomic_replace(destination_path) as temp_path:
+        # write straight to a temporary file next to the destination rather than buffering the image in memory
         image_type = Quartz.CGImageSourceGetType(image_data)
-        dest_data = NSMutableData.data()
-        destination = Quartz.CGImageDestinationCreateWithData(dest_data, image_type, 1, None)
+        temp_url = NSURL.fileURLWithPath_(temp_path)
+        destination = Quartz.CGImageDestinationCreateWithURL(temp_url, image_type, 1, None)
         if not destination:
             raise ValueError(f"Could not create image destination for {destination_path}")
-        with pipes() as (_out, _err):
-            # use pipes to catch error messages from CGImageDestinationAddImageFromSource
+        with suppress_stderr():
+            # suppress error messages from CGImageDestinationAddImageFromSource
             # there's a bug in Core Graphics that causes an error similar to
             # AVEBridge Info: AVEEncoder_CreateInstance: Received CreateInstance (from VT)
             # ... AVEBridge Error: AVEEncoder_CreateInstance: returning err = -12908
@@ -88,29 +155,37 @@ def write_image_with_metadata(
             # reference: https://github.com/biodranik/HEIF/issues/5 and
             # https://forums.developer.apple.com/forums/thread/722204
             Quartz.CGImageDestinationAddImageFromSource(destination, image_data, 0, metadata)
-            Quartz.CGImageDestinationFinalize(destination)
-            new_image_data = NSData.dataWithData_(dest_data)
-            new_image_data.writeToFile_atomically_(destination_path, True)
+            success = Quartz.CGImageDestinationFinalize(destination)
+        if not success:
+            raise OSError(f"Could not write image to {destination_path}")
 
 
 def metadata_dict_for_asset_id(image_data: Quartz.CGImageSourceRef, asset_id: str) -> CFDictionaryRef:
-    """Create a CFDictionaryRef with the asset id in the MakerApple dictionary and merge with existing metadata
+    """Create a CFDictionaryRef with the asset id added to the image's existing MakerApple dictionary
 
     Args:
         image_data: CGImageSourceRef with the image data.
         asset_id: The asset id to write to the file.
 
-    Returns: CFDictionaryRef with the new metadata dictionary.
+    Returns: CFDictionaryRef containing only the updated MakerApple dictionary.
+
+    Note:
+        CGImageDestinationAddImageFromSource keeps the source image's properties and replaces only the
+        top-level keys present in the dictionary passed to it so the rest of the metadata does not need
+        to be copied; the MakerApple dictionary is copied in full so none of its other entries are lost.
     """
-    with objc.autorelease_pool():
-        metadata = Quartz.CGImageSourceCopyPropertiesAtIndex(image_data, 0, None)
-        metadata_as_mutable = metadata.mutableCopy()
-        maker_apple = metadata_as_mutable.objectForKey_(Quartz.kCGImagePropertyMakerAppleDictionary)
-        if not maker_apple:
-            maker_apple = NSMutableDictionary.alloc().init()
-        maker_apple.setObject_forKey_(asset_id, kFigAppleMakerNote_AssetIdentifier)
-        metadata_as_mutable.setObject_forKey_(maker_apple, Quartz.kCGImagePropertyMakerAppleDictionary)
-        return metadata_as_mutable
+    import Quartz
+    from Foundation import NSDictionary
+
+    maker_apple_key = Quartz.kCGImagePropertyMakerAppleDictionary
+    metadata = Quartz.CGImageSourceCopyPropertiesAtIndex(image_data, 0, None)
+    asset_id_key = _nsstring(kFigAppleMakerNote_AssetIdentifier)
+    if maker_apple := (metadata.objectForKey_(maker_apple_key) if metadata else None):
+        maker_apple = maker_apple.mutableCopy()
+        maker_apple.setObject_forKey_(asset_id, asset_id_key)
+    else:
+        maker_apple = NSDictionary.dictionaryWithObject_forKey_(asset_id, asset_id_key)
+    return NSDictionary.dictionaryWithObject_forKey_(maker_apple, maker_apple_key)
 
 
 def add_asset_id_to_image_file(
@@ -122,8 +197,24 @@ def add_asset_id_to_image_file(
     Args:
         image_path: Path to the image file.
         asset_id: The asset id to write to the file.
+
+    Note:
+        If the image contains an EXIF block, the asset id is written directly to the MakerNote
+        without re-encoding the image; otherwise the image is rewritten using Core Graphics.
     """
     image_path = str(image_path)
+    try:
+        write_asset_id_to_image(image_path, asset_id)
+        return
+    except ExifError:
+        # EXIF block missing or not in a form we can edit; let Core Graphics rewrite the image
+        pass
+
+    _add_asset_id_with_core_graphics(image_path, asset_id)
+
+
+def _add_asset_id_with_core_graphics(image_path: str, asset_id: str) -> None:
+    """Write the asset id to the image at image_path by rewriting the image with Core Graphics"""
     with objc.autorelease_pool():
         image_data = image_source_from_path(image_path)
         metadata = metadata_dict_for_asset_id(image_data, asset_id)
@@ -141,11 +232,13 @@ def avmetadata_for_asset_id(asset_id: str) -> AVFoundation.AVMetadataItem:
 
     Returns: AVMetadataItem with the asset id.
     """
+    import AVFoundation
+
     item = AVFoundation.AVMutableMetadataItem.metadataItem()
-    item.setKey_(kKeyContentIdentifier)
-    item.setKeySpace_(kKeySpaceQuickTimeMetadata)
+    item.setKey_(_nsstring(kKeyContentIdentifier))
+    item.setKeySpace_(_nsstring(kKeySpaceQuickTimeMetadata))
     item.setValue_(asset_id)
-    item.setDataType_("com.apple.metadata.datatype.UTF-8")
+    item.setDataType_(_nsstring(kDataTypeUTF8))
     return item
 
 
@@ -158,16 +251,42 @@ def add_asset_id_to_quicktime_file(filepath: str | os.PathLike, asset_id: str) -
 
     Returns: Error message if there was an error, otherwise None.
 
+    Note: The asset id is written directly to the movie metadata without rewriting the media data.
+    If the movie metadata cannot be edited directly, the movie is re-exported with AV Foundation;
+    in this case XMP metadata in the QuickTime movie file is not preserved which may result in metadata loss.
+    """
+    try:
+        write_asset_id_to_quicktime(filepath, asset_id)
+        return None
+    except QuickTimeError:
+        # metadata not in a form we can edit; let AV Foundation re-export the movie
+        pass
+
+    return export_quicktime_file_with_asset_id(filepath, asset_id)
+
+
+def export_quicktime_file_with_asset_id(filepath: str | os.PathLike, asset_id: str) -> str | None:
+    """Re-export a QuickTime movie file at filepath with the asset id using AVAssetExportSession
+
+    Args:
+        filepath: Path to the QuickTime movie file.
+        asset_id: The asset id to write to the file.
+
+    Returns: Error message if there was an error, otherwise None.
+
     Note: XMP metadata in the QuickTime movie file is not preserved by this function which
     may result in metadata loss.
     """
+    import AVFoundation
+    import libdispatch
+    from Foundation import NSURL
+
     filepath = pathlib.Path(filepath)
     with objc.autorelease_pool():
-        # rename file so export can write to original path
+        # export to a temporary file in the same directory then atomically replace the original
         temp_filepath = filepath.parent / f".{asset_id}_{filepath.name}"
-        os.rename(filepath, temp_filepath)
-        input_url = NSURL.fileURLWithPath_(str(temp_filepath))
-        output_url = NSURL.fileURLWithPath_(str(filepath))
+        input_url = NSURL.fileURLWithPath_(str(filepath))
+        output_url = NSURL.fileURLWithPath_(str(temp_filepath))
         asset = AVFoundation.AVAsset.assetWithURL_(input_url)
         metadata_item = avmetadata_for_asset_id(asset_id)
         export_session = AVFoundation.AVAssetExportSession.alloc().initWithAsset_presetName_(
@@ -179,42 +298,42 @@ def add_asset_id_to_quicktime_file(filepath: str | os.PathLike, asset_id: str) -
         export_session.setMetadata_([metadata_item])
 
         # exportAsynchronouslyWithCompletionHandler_ is an asynchronous method that return immediately
-        # To wait for the export to complete, use a threading.Event to block until the completion handler is called.
-        event = threading.Event()
-        error = None
+        # To wait for the export to complete, block on a dispatch semaphore signaled by the completion handler
+        # then read the export status from the session.
+        semaphore = libdispatch.dispatch_semaphore_create(0)
 
-        def _completion_handler():
-            nonlocal error
-            if error_val := export_session.error():
-                error = error_val.description()
-            event.set()
+        def completion_handler() -> None:
+            # the completion handler is a void block so it must return None
+            libdispatch.dispatch_semaphore_signal(semaphore)
 
-        export_session.exportAsynchronouslyWithCompletionHandler_(_completion_handler)
-        event.wait()
+        export_session.exportAsynchronouslyWithCompletionHandler_(completion_handler)
+        libdispatch.dispatch_semaphore_wait(semaphore, libdispatch.DISPATCH_TIME_FOREVER)
+
+        error = None
+        if error_val := export_session.error():
+            error = error_val.description()
+        elif export_session.status() != AVFoundation.AVAssetExportSessionStatusCompleted:
+            error = f"Export of {filepath} did not complete"
 
         if error:
-            try:
-                # filepath might not exist if export failed
-                os.unlink(filepath)
-            except FileNotFoundError:
-                pass
-            os.rename(temp_filepath, filepath)
+            # temp_filepath might not exist if export failed
+            temp_filepath.unlink(missing_ok=True)
         else:
-            os.unlink(temp_filepath)
+            # the export is a new file so carry over the permissions of the original before replacing it
+            shutil.copymode(filepath, temp_filepath)
+            os.replace(temp_filepath, filepath)
 
-        return error or None
+        return error
 
 
 def is_image_file(filepath: str | os.PathLike):
     """Return True if the file is a JPEG or HEIC image file"""
-    filepath = pathlib.Path(filepath)
-    return filepath.suffix.lower() in [".jpg", ".jpeg", ".heic", ".heif"]
+    return os.path.splitext(filepath)[1].lower() in IMAGE_EXTENSIONS
 
 
 def is_video_file(filepath: str | os.PathLike):
     """Return True if the file is a MOV or MP4 video file"""
-    filepath = pathlib.Path(filepath)
-    return filepath.suffix.lower() in [".mov", ".mp4"]
+    return os.path.splitext(filepath)[1].lower() in VIDEO_EXTENSIONS
 
 
 ### Public API ###
@@ -230,24 +349,32 @@ def make_live_photo(
     Args:
         image_path: Path to the image file.
         video_path: Path to the QuickTime movie file.
-        asset_id: The asset id to write to the file; if not provided a unique asset will be created.
+        asset_id: The asset id to write to the file; if not provided the existing or a new unique asset id is used.
 
     Returns: The asset id (content identifier) written to the photo + video pair.
 
     Raises:
         FileNotFoundError: If image_path or video_path do not exist.
         ValueError: If image_path is not a JPEG or HEIC image or video_path is not a QuickTime movie file.
+        OSError: If the asset id could not be written to video_path.
 
     Note:
-        If asset_id is not provided, a unique asset id will be generated and used.
+        If asset_id is not provided, the existing asset id of the image or video will be used if
+        either has one; otherwise a unique asset id will be generated and used.
         The asset_id is written to the ContentIdentifier metadata in the image and video files.
-        If the image or video already have a ContentIdentifier, it will be overwritten.
+        If the image or video already have a different ContentIdentifier, it will be overwritten.
+        Files that already have the ContentIdentifier set to asset_id are not modified; if the pair is
+        already a Live Photo, it is returned unchanged unless a different asset_id is passed, so to
+        give an existing Live Photo a fresh asset id, pass a new asset_id explicitly.
         The image and video files will be modified in place.
 
-        Note: XMP metadata in the QuickTime movie file is not preserved by this function which
-        may result in metadata loss.
+        Note: If the metadata of the QuickTime movie file cannot be edited directly, the movie is
+        re-exported and XMP metadata in the QuickTime movie file is not preserved which may result
+        in metadata loss.
 
-        Metadata including EXIF, IPTC, and XMP are preserved in the image file but will be rewritten
+        If the image file contains an EXIF block, only the Apple MakerNote is updated and the rest of
+        the image file, including the compressed image data, is left unchanged.
+        Otherwise, metadata including EXIF, IPTC, and XMP are preserved in the image file but will be rewritten
         and the Core Graphics API may change the order of the metadata and normalize the values.
         For example, the tag XMP:TagsList will be rewritten as XMP:Subject and the value will be
         normalized to a list of title case strings.
@@ -256,22 +383,72 @@ def make_live_photo(
         metadata using a tool like exiftool before calling this function and then restore the metadata
         after calling this function. (But take care not to delete the ContentIdentifier metadata.)
     """
-    image_path = pathlib.Path(image_path)
-    video_path = pathlib.Path(video_path)
-    if not image_path.exists():
+    image_path = os.fspath(image_path)
+    video_path = os.fspath(video_path)
+    if not os.path.exists(image_path):
         raise FileNotFoundError(f"{image_path} does not exist")
-    if not video_path.exists():
+    if not os.path.exists(video_path):
         raise FileNotFoundError(f"{video_path} does not exist")
     if not is_image_file(image_path):
         raise ValueError(f"{image_path} is not a JPEG or HEIC image")
     if not is_video_file(video_path):
         raise ValueError(f"{video_path} is not a QuickTime movie file")
-    asset_id = asset_id or str(uuid.uuid4()).upper()
-    add_asset_id_to_image_file(image_path, asset_id)
-    add_asset_id_to_quicktime_file(video_path, asset_id)
+
+    # skip rewriting files that already have the right asset id
+    image_id = _image_live_id(image_path)
+    video_id = _video_live_id(video_path)
+    if image_id and image_id == video_id and asset_id in (None, image_id):
+        return image_id
+
+    asset_id = asset_id or image_id or video_id or new_asset_id()
+    # the files are usually edited directly in pure Python which holds the GIL so they are written one after the other
+    if image_id != asset_id:
+        _call_in_autorelease_pool(add_asset_id_to_image_file, image_path, asset_id)
+    if video_id != asset_id and (error := _call_in_autorelease_pool(add_asset_id_to_quicktime_file, video_path, asset_id)):
+        raise OSError(f"Could not write asset id to {video_path}: {error}")
     return asset_id
 
 
+def _make_live_photo_result(
+    pair: tuple[str | os.PathLike, str | os.PathLike] | tuple[str | os.PathLike, str | os.PathLike, str | None],
+) -> tuple[str | None, Exception | None]:
+    """Make a single pair a Live Photo and return a tuple of asset_id, error for make_live_photos"""
+    try:
+        return _call_in_autorelease_pool(make_live_photo, *pair), None
+    except Exception as e:  # noqa: BLE001 (errors are returned to the caller per pair)
+        return None, e
+
+
+def make_live_photos(
+    pairs: Iterable[tuple[str | os.PathLike, str | os.PathLike] | tuple[str | os.PathLike, str | os.PathLike, str | None]],
+    max_workers: int = 4,
+) -> list[tuple[str | None, Exception | None]]:
+    """Make many JPEG/HEIC image and QuickTime video pairs Live Photos, processing several pairs at a time
+
+    Args:
+        pairs: Iterable of (image_path, video_path) or (image_path, video_path, asset_id) tuples;
+            see make_live_photo for details of each argument.
+        max_workers: Maximum number of pairs to process at the same time.
+
+    Returns: list of (asset_id, error) tuples in the same order as pairs; asset_id is the asset id written
+        to the pair and error is None if the pair was processed successfully, otherwise asset_id is None and
+        error is the exception raised while processing the pair.
+
+    Note:
+        Each pair is processed with make_live_photo; see make_live_photo for how the files are modified.
+        An error processing one pair does not stop the remaining pairs from being processed.
+        Like the makelive command, the pairs are processed in separate processes because the metadata
+        is edited in pure Python which holds the GIL; when calling this from a script, guard the call
+        with `if __name__ == "__main__":` so the worker processes can import the script.
+    """
+    pairs = list(pairs)
+    workers = min(max_workers, len(pairs))
+    if workers <= 1:
+        return [_make_live_photo_result(pair) for pair in pairs]
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_make_live_photo_result, pairs))
+
+
 def save_live_photo_pair_as_pvt(
     image_path: str | os.PathLike,
     video_path: str | os.PathLike,
@@ -285,7 +462,7 @@ def save_live_photo_pair_as_pvt(
         image_path: Path to the image file.
         video_path: Path to the QuickTime movie file.
         pvt_path: Path to directory in which to write the .pvt package file; if None, writes the .pvt file in the parent of the image_path.
-        asset_id: The asset id to write to the file; if not provided a unique asset will be created.
+        asset_id: The asset id to write to the file; if not provided the existing or a new unique asset id is used.
 
     Returns: Tuple of Asset ID, Path to the .pvt package file.
 
@@ -295,15 +472,22 @@ def save_live_photo_pair_as_pvt(
 
     Note:
         The .pvt package will have the same stem as the image file with a .pvt extension.
-        If asset_id is not provided, a unique asset id will be generated and used.
+        If asset_id is not provided, the existing asset id of the image or video will be used if
+        either has one; otherwise a unique asset id will be generated and used.
         The asset_id is written to the ContentIdentifier metadata in the image and video files.
-        If the image or video already have a ContentIdentifier, it will be overwritten.
+        If the image or video already have a different ContentIdentifier, it will be overwritten.
+        Files that already have the ContentIdentifier set to asset_id are not modified; if the pair is
+        already a Live Photo, it is returned unchanged unless a different asset_id is passed, so to
+        give an existing Live Photo a fresh asset id, pass a new asset_id explicitly.
         The image and video files will be modified in place.
 
-        Note: XMP metadata in the QuickTime movie file is not preserved by this function which
-        may result in metadata loss.
+        Note: If the metadata of the QuickTime movie file cannot be edited directly, the movie is
+        re-exported and XMP metadata in the QuickTime movie file is not preserved which may result
+        in metadata loss.
 
-        Metadata including EXIF, IPTC, and XMP are preserved in the image file but will be rewritten
+        If the image file contains an EXIF block, only the Apple MakerNote is updated and the rest of
+        the image file, including the compressed image data, is left unchanged.
+        Otherwise, metadata including EXIF, IPTC, and XMP are preserved in the image file but will be rewritten
         and the Core Graphics API may change the order of the metadata and normalize the values.
         For example, the tag XMP:TagsList will be rewritten as XMP:Subject and the value will be
         normalized to a list of title case strings.
@@ -327,30 +511,17 @@ def _make_pvt_package(
 ) -> tuple[str, pathlib.Path]:
     """Create a .pvt Live Photo package from an image and video file."""
     pvt_path.mkdir(exist_ok=True)
-    shutil.copy(image_path, pvt_path)
-    shutil.copy(video_path, pvt_path)
+    clone_or_copy(image_path, pvt_path / image_path.name)
+    clone_or_copy(video_path, pvt_path / video_path.name)
     image_path = pvt_path / image_path.name
     video_path = pvt_path / video_path.name
 
-    # if not already a Live Pair or asset_id is not None, make it a Live Pair with the asset_id if provided
-    if not is_live_photo_pair(image_path, video_path) or asset_id is not None:
-        asset_id = make_live_photo(image_path, video_path, asset_id)
-    else:
-        asset_id = live_id(image_path)
+    # make_live_photo reads the existing asset ids once and leaves the files alone if they are already a Live Pair
+    asset_id = make_live_photo(image_path, video_path, asset_id)
 
     # create the metadata.plist file
-    xml_metadata = """
-        <?xml version="1.0" encoding="UTF-8"?><!DOCTYPE plist PUBLIC "-//Apple//DTD PLIST 1.0//EN" "http://www.apple.com/DTDs/PropertyList-1.0.dtd">
-        <plist version="1.0">
-            <dict>
-                <key>PFVideoComplementMetadataVersionKey</key>
-                <string>1</string>
-            </dict>
-        </plist>
-        """
-
-    with open(pvt_path / "metadata.plist", "w") as metadata_file:
-        metadata_file.write(xml_metadata)
+    with open(pvt_path / "metadata.plist", "wb") as metadata_file:
+        plistlib.dump(PVT_METADATA, metadata_file, fmt=plistlib.FMT_BINARY)
 
     return asset_id, pvt_path
 
@@ -371,26 +542,61 @@ def live_id(filepath: str | os.PathLike) -> str | None:
         FileNotFoundError: If the file does not exist.
         ValueError: If the file is not a JPEG/HEIC image or MOV/MP4 video file.
     """
-    filepath = pathlib.Path(filepath)
-    if not filepath.exists():
+    filepath = os.fspath(filepath)
+    if not os.path.exists(filepath):
         raise FileNotFoundError(f"{filepath} does not exist")
 
     if is_image_file(filepath):
-        md = cgmetadata.ImageMetadata(filepath)
-        try:
-            return md.asdict()["MakerApple"]["17"]
-        except KeyError:
-            return None
-    elif is_video_file(filepath):
-        with objc.autorelease_pool():
-            url = NSURL.fileURLWithPath_(str(filepath))
-            asset = AVFoundation.AVAsset.assetWithURL_(url)
-            for item in asset.metadata():
-                if item.key() == kKeyContentIdentifier and item.keySpace() == kKeySpaceQuickTimeMetadata:
-                    return str(item.value())
+        return _image_live_id(filepath)
+    if is_video_file(filepath):
+        return _video_live_id(filepath)
+    raise ValueError(f"{filepath} is not a JPEG/HEIC image or MOV/MP4 video file")
+
+
+def _image_live_id(filepath: str) -> str | None:
+    """Return the content identifier of an existing JPEG/HEIC image file or None"""
+    if not os.path.getsize(filepath):
+        # nothing to read; don't hand an empty file to Core Graphics
         return None
-    else:
-        raise ValueError(f"{filepath} is not a JPEG/HEIC image or MOV/MP4 video file")
+    try:
+        return read_asset_id_from_image(filepath)
+    except ExifError:
+        # EXIF block missing or not in a form we can read; fall back to Core Graphics
+        pass
+
+    import Quartz
+
+    # read only the MakerApple dictionary rather than converting all of the metadata to Python
+    with objc.autorelease_pool():
+        image_source = image_source_from_path(filepath)
+        properties = Quartz.CGImageSourceCopyPropertiesAtIndex(image_source, 0, None)
+        maker_apple = properties.objectForKey_(Quartz.kCGImagePropertyMakerAppleDictionary) if properties else None
+        asset_id = maker_apple.objectForKey_(_nsstring(kFigAppleMakerNote_AssetIdentifier)) if maker_apple else None
+        return str(asset_id) if asset_id else None
+
+
+def _video_live_id(filepath: str) -> str | None:
+    """Return the content identifier of an existing MOV/MP4 video file or None"""
+    if not os.path.getsize(filepath):
+        # nothing to read; don't hand an empty file to AV Foundation
+        return None
+    try:
+        return read_asset_id_from_quicktime(filepath)
+    except QuickTimeError:
+        # movie metadata not in a form we can read; fall back to AV Foundation
+        pass
+
+    import AVFoundation
+    from Foundation import NSURL
+
+    with objc.autorelease_pool():
+        url = NSURL.fileURLWithPath_(filepath)
+        asset = AVFoundation.AVAsset.assetWithURL_(url)
+        # filter the metadata items in AV Foundation rather than calling key() and keySpace() on each item
+        items = AVFoundation.AVMetadataItem.metadataItemsFromArray_withKey_keySpace_(
+            asset.metadata(), _nsstring(kKeyContentIdentifier), _nsstring(kKeySpaceQuickTimeMetadata)
+        )
+        return str(items[0].value()) if items else None
 
 
 def is_live_photo_pair(image_path: str | os.PathLike, video_path: str | os.PathLike) -> str | bool:
@@ -406,11 +612,11 @@ def is_live_photo_pair(image_path: str | os.PathLike, video_path: str | os.PathL
         FileNotFoundError: If image_path or video_path does not exist.
         ValueError: If image_path is not a JPEG or HEIC image or video_path is not a QuickTime movie file.
     """
-    image_path = pathlib.Path(image_path)
-    video_path = pathlib.Path(video_path)
-    if not image_path.exists():
+    image_path = os.fspath(image_path)
+    video_path = os.fspath(video_path)
+    if not os.path.exists(image_path):
         raise FileNotFoundError(f"{image_path} does not exist")
-    if not video_path.exists():
+    if not os.path.exists(video_path):
         raise FileNotFoundError(f"{video_path} does not exist")
 
     if not is_image_file(image_path):
@@ -418,7 +624,8 @@ def is_live_photo_pair(image_path: str | os.PathLike, video_path: str | os.PathL
     if not is_video_file(video_path):
         raise ValueError("Video file is not a QuickTime movie file")
 
-    if image_id := live_id(image_path):
-        if video_id := live_id(video_path):
+    # the file types were checked above so read the ids directly rather than through live_id
+    if image_id := _image_live_id(image_path):
+        if video_id := _video_live_id(video_path):
             return image_id if image_id == video_id else False
     return False
@@ -0,0 +1,317 @@
+"""Read and write the Live Photo asset id in the metadata of a QuickTime movie without rewriting the movie data
+
+The functions in this module read and edit the moov atom of the file directly; the media data in the mdat
+atom is never parsed or moved. Callers should fall back to AV Foundation if QuickTimeError is raised.
+"""
+
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+
+from .fileutil import atomic_replace
+
+# key and key space for the asset ID in the QuickTime movie metadata
+KEY_CONTENT_IDENTIFIER = b"com.apple.quicktime.content.identifier"
+KEY_SPACE_QUICKTIME_METADATA = b"mdta"
+
+# well-known data type for UTF-8 strings in a QuickTime metadata data atom
+DATA_TYPE_UTF8 = 1
+
+# atom types that contain only padding and may be overwritten
+FREE_ATOM_TYPES = (b"free", b"skip")
+
+ATOM_HEADER_SIZE = 8
+
+
+class QuickTimeError(ValueError):
+    """Raised when the metadata of a QuickTime movie cannot be read or updated"""
+
+
+# An atom is (type, offset of atom, offset of payload, offset of end of atom)
+Atom = tuple[bytes, int, int, int]
+
+
+def _atom(atom_type: bytes, payload: bytes) -> bytes:
+    """Return a serialized atom"""
+    return struct.pack(">I4s", ATOM_HEADER_SIZE + len(payload), atom_type) + payload
+
+
+def _free_atom(size: int) -> bytes:
+    """Return a free atom of the given total size"""
+    return _atom(b"free", bytes(size - ATOM_HEADER_SIZE))
+
+
+def _parse_atoms(data: bytes | mmap.mmap, start: int, end: int) -> list[Atom]:
+    """Parse the atoms in data[start:end]"""
+    atoms = []
+    offset = start
+    while offset + ATOM_HEADER_SIZE <= end:
+        size, atom_type = struct.unpack_from(">I4s", data, offset)
+        header_size = ATOM_HEADER_SIZE
+        if size == 1:
+            if offset + 16 > end:
+                raise QuickTimeError(f"Truncated atom at offset {offset}")
+            (size,) = struct.unpack_from(">Q", data, offset + 8)
+            header_size = 16
+        elif size == 0:
+            size = end - offset
+        if size < header_size or offset + size > end:
+            raise QuickTimeError(f"Invalid atom size at offset {offset}")
+        atoms.append((atom_type, offset, offset + header_size, offset + size))
+        offset += size
+    return atoms
+
+
+def _keys_index(keys: bytes) -> tuple[list[bytes], int | None]:
+    """Parse the payload of a keys atom
+
+    Returns: tuple of list of key entries (including their size and namespace), 1-based index of
+        the content identifier key or None if not present
+    """
+    if len(keys) < 8:
+        raise QuickTimeError("Invalid keys atom")
+    (count,) = struct.unpack_from(">I", keys, 4)
+    entries = []
+    index = None
+    offset = 8
+    for i in range(count):
+        if offset + 8 > len(keys):
+            raise QuickTimeError("Invalid keys atom")
+        size, namespace = struct.unpack_from(">I4s", keys, offset)
+        if size < 8 or offset + size > len(keys):
+            raise QuickTimeError("Invalid keys atom")
+        if namespace == KEY_SPACE_QUICKTIME_METADATA and keys[offset + 8 : offset + size] == KEY_CONTENT_IDENTIFIER:
+            index = i + 1
+        entries.append(keys[offset : offset + size])
+        offset += size
+    return entries, index
+
+
+def _meta_children(meta: bytes) -> tuple[Atom, int, list[Atom]]:
+    """Parse a QuickTime metadata (mdta) meta atom
+
+    Returns: tuple of the meta atom, offset of its first child atom, list of its child atoms
+
+    Raises:
+        QuickTimeError: If the meta atom is not a QuickTime (mdta) metadata atom.
+    """
+    (meta_atom,) = _parse_atoms(meta, 0, len(meta))
+    _, _, payload_start, end = meta_atom
+    # QuickTime meta atoms contain child atoms directly but ISO meta boxes start with version/flags
+    if meta[payload_start + 4 : payload_start + 8] != b"hdlr":
+        payload_start += 4
+    children = _parse_atoms(meta, payload_start, end)
+    hdlr = next((child for child in children if child[0] == b"hdlr"), None)
+    if hdlr is None:
+        raise QuickTimeError("meta atom has no hdlr atom")
+    if meta[hdlr[2] + 8 : hdlr[2] + 12] != b"mdta":
+        raise QuickTimeError("meta atom is not QuickTime metadata")
+    return meta_atom, payload_start, children
+
+
+def meta_with_asset_id(meta: bytes | None, asset_id: str) -> bytes:
+    """Return a moov/meta atom with the asset id set as the content identifier
+
+    Args:
+        meta: The existing meta atom (including header) or None to create a new one.
+        asset_id: The asset id to write.
+
+    Returns: The new meta atom including header.
+
+    Raises:
+        QuickTimeError: If the existing meta atom is not a QuickTime (mdta) metadata atom.
+    """
+    item_data = _atom(b"data", struct.pack(">II", DATA_TYPE_UTF8, 0) + asset_id.encode("utf-8"))
+    key_entry = struct.pack(">I4s", 8 + len(KEY_CONTENT_IDENTIFIER), KEY_SPACE_QUICKTIME_METADATA) + KEY_CONTENT_IDENTIFIER
+
+    if meta is None:
+        hdlr = _atom(b"hdlr", bytes(8) + b"mdta" + bytes(14))
+        keys = _atom(b"keys", struct.pack(">II", 0, 1) + key_entry)
+        ilst = _atom(b"ilst", _atom(struct.pack(">I", 1), item_data))
+        return _atom(b"meta", hdlr + keys + ilst)
+
+    meta_atom, payload_start, children = _meta_children(meta)
+    child_types = [child[0] for child in children]
+
+    if b"keys" in child_types:
+        keys = children[child_types.index(b"keys")]
+        key_entries, index = _keys_index(meta[keys[2] : keys[3]])
+        version_flags = meta[keys[2] : keys[2] + 4]
+    else:
+        key_entries, index, version_flags = [], None, bytes(4)
+    if index is None:
+        key_entries.append(key_entry)
+        index = len(key_entries)
+    new_keys = _atom(b"keys", version_flags + struct.pack(">I", len(key_entries)) + b"".join(key_entries))
+
+    item = _atom(struct.pack(">I", index), item_data)
+    items = []
+    if b"ilst" in child_types:
+        ilst = children[child_types.index(b"ilst")]
+        items = [
+            meta[item_start:item_end]
+            for item_type, item_start, _, item_end in _parse_atoms(meta, ilst[2], ilst[3])
+            if item_type != struct.pack(">I", index)
+        ]
+    new_ilst = _atom(b"ilst", b"".join(items) + item)
+
+    new_payload = bytearray(meta[meta_atom[2] : payload_start])
+    for child_type, child_start, _, child_end in children:
+        if child_type == b"keys":
+            new_payload += new_keys
+        elif child_type == b"ilst":
+            new_payload += new_ilst
+        else:
+            new_payload += meta[child_start:child_end]
+    if b"keys" not in child_types:
+        new_payload += new_keys
+    if b"ilst" not in child_types:
+        new_payload += new_ilst
+    return _atom(b"meta", bytes(new_payload))
+
+
+def moov_with_asset_id(moov: bytes, asset_id: str) -> bytes:
+    """Return a copy of the moov atom with the asset id set as the content identifier
+
+    Args:
+        moov: The moov atom including header.
+        asset_id: The asset id to write.
+
+    Returns: The new moov atom including header.
+
+    Raises:
+        QuickTimeError: If the moov atom could not be updated.
+    """
+    (moov_atom,) = _parse_atoms(moov, 0, len(moov))
+    children = _parse_atoms(moov, moov_atom[2], moov_atom[3])
+    new_payload = bytearray()
+    found_meta = False
+    for child_type, child_start, _, child_end in children:
+        if child_type == b"meta" and not found_meta:
+            new_payload += meta_with_asset_id(moov[child_start:child_end], asset_id)
+            found_meta = True
+        else:
+            new_payload += moov[child_start:child_end]
+    if not found_meta:
+        new_payload += meta_with_asset_id(None, asset_id)
+    return _atom(b"moov", bytes(new_payload))
+
+
+def read_asset_id_from_quicktime(filepath: str | os.PathLike) -> str | None:
+    """Read the asset id from the metadata of a QuickTime or MP4 movie without loading the movie with AV Foundation
+
+    Args:
+        filepath: Path to the movie file.
+
+    Returns: The asset id or None if the movie has no content identifier.
+
+    Raises:
+        QuickTimeError: If the movie metadata could not be read.
+    """
+    with open(filepath, "rb") as file:
+        if not os.fstat(file.fileno()).st_size:
+            raise QuickTimeError(f"{filepath} is empty")
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            moov_atoms = [atom for atom in _parse_atoms(data, 0, len(data)) if atom[0] == b"moov"]
+            if len(moov_atoms) != 1:
+                raise QuickTimeError(f"Expected one moov atom, found {len(moov_atoms)}")
+            _, _, moov_payload, moov_end = moov_atoms[0]
+            meta = next((atom for atom in _parse_atoms(data, moov_payload, moov_end) if atom[0] == b"meta"), None)
+            if meta is None:
+                return None
+            meta = data[meta[1] : meta[3]]
+
+    _, _, children = _meta_children(meta)
+    child_types = [child[0] for child in children]
+    if b"keys" not in child_types or b"ilst" not in child_types:
+        return None
+    keys = children[child_types.index(b"keys")]
+    _, index = _keys_index(meta[keys[2] : keys[3]])
+    if index is None:
+        return None
+    ilst = children[child_types.index(b"ilst")]
+    for item_type, _, item_payload, item_end in _parse_atoms(meta, ilst[2], ilst[3]):
+        if item_type != struct.pack(">I", index):
+            continue
+        for data_type, _, data_payload, data_end in _parse_atoms(meta, item_payload, item_end):
+            if data_type != b"data" or data_end - data_payload < 8:
+                continue
+            (well_known_type,) = struct.unpack_from(">I", meta, data_payload)
+            if well_known_type != DATA_TYPE_UTF8:
+                raise QuickTimeError(f"Unexpected data type {well_known_type} for content identifier")
+            # data atom payload is type indicator and locale followed by the value
+            try:
+                return meta[data_payload + 8 : data_end].decode("utf-8")
+            except UnicodeDecodeError as e:
+                raise QuickTimeError(f"Invalid content identifier: {e}") from e
+    return None
+
+
+def write_asset_id_to_quicktime(filepath: str | os.PathLike, asset_id: str) -> None:
+    """Write the asset id to the metadata of a QuickTime or MP4 movie without rewriting the media data
+
+    Args:
+        filepath: Path to the movie file.
+        asset_id: The asset id to write.
+
+    Raises:
+        QuickTimeError: If the movie metadata could not be updated.
+
+    Note:
+        The movie is edited in a temporary copy which then replaces the original file, so the original
+        is left untouched if the write fails; the copy is a copy-on-write clone where the file system
+        supports it (e.g. APFS) and a full copy otherwise. In the copy, the new moov
+        atom is written in place of the existing moov atom if it fits (using any free atom following it)
+        or if the moov atom is the last atom in the file. Otherwise the new moov atom is appended to the
+        end of the file and the old one is turned into a free atom (an atom that extends to the end of the
+        file is first given an explicit size); because the media data is never moved,
+        the chunk offsets in the moov atom remain valid.
+    """
+    with open(filepath, "rb") as file:
+        file_size = os.fstat(file.fileno()).st_size
+        if not file_size:
+            raise QuickTimeError(f"{filepath} is empty")
+        # map the file read-only to locate the atoms; only the moov atom is copied out of the mapping
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            atoms = _parse_atoms(data, 0, file_size)
+            moov_atoms = [atom for atom in atoms if atom[0] == b"moov"]
+            if len(moov_atoms) != 1:
+                raise QuickTimeError(f"Expected one moov atom, found {len(moov_atoms)}")
+            moov_atom = moov_atoms[0]
+            _, moov_start, _, moov_end = moov_atom
+            new_moov = moov_with_asset_id(data[moov_start:moov_end], asset_id)
+            # an atom with size 0 extends to the end of the file; only the last atom can do so
+            last_start = atoms[-1][1]
+            last_open_ended = struct.unpack_from(">I", data, last_start)[0] == 0
+
+    # space available in place is the moov atom plus any free atoms immediately following it
+    available_end = moov_end
+    for atom_type, atom_start, _, atom_end in atoms[atoms.index(moov_atom) + 1 :]:
+        if atom_type not in FREE_ATOM_TYPES or atom_start != available_end:
+            break
+        available_end = atom_end
+    available = available_end - moov_start
+
+    with atomic_replace(filepath, clone=True) as temp_path, open(temp_path, "r+b") as file:
+        if available_end == file_size:
+            file.seek(moov_start)
+            file.write(new_moov)
+            file.truncate()
+        elif len(new_moov) == available or len(new_moov) + ATOM_HEADER_SIZE <= available:
+            file.seek(moov_start)
+            file.write(new_moov)
+            if len(new_moov) < available:
+                file.write(_free_atom(available - len(new_moov)))
+        else:
+            if last_open_ended:
+                # give the last atom an explicit size so it does not swallow the appended moov atom
+                if file_size - last_start >= 1 << 32:
+                    raise QuickTimeError(f"Atom at offset {last_start} extends to end of file and is too large to resize")
+                file.seek(last_start)
+                file.write(struct.pack(">I", file_size - last_start))
+            file.seek(file_size)
+            file.write(new_moov)
+            file.seek(moov_start + 4)
+            file.write(b"free")
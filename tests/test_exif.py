@@ -0,0 +1,113 @@
+"""Test exif.py"""
+
+from __future__ import annotations
+
+import os
+import pathlib
+import shutil
+import struct
+
+import pytest
+
+from makelive.exif import ExifError, read_asset_id_from_image, write_asset_id_to_image
+
+TEST_IMAGE: pathlib.Path = pathlib.Path("tests/test.jpeg")
+TEST_IMAGE_HEIC: pathlib.Path = pathlib.Path("tests/test2.heic")
+
+ASSET_ID = "B8D41CCF-1F4E-49DF-8539-523493120134"
+ASSET_ID_2 = "2C804E44-1972-4551-83EF-92E0C0A9CB31"
+
+# start of scan marker followed by stand-in image data and the end of image marker
+JPEG_IMAGE_DATA = b"\xff\xda\x00\x02image data\xff\xd9"
+
+
+def jpeg_with_tiff(tiff: bytes) -> bytes:
+    """Return a minimal JPEG with tiff in its EXIF APP1 segment"""
+    payload = b"Exif\x00\x00" + tiff
+    return b"\xff\xd8" + struct.pack(">BBH", 0xFF, 0xE1, 2 + len(payload)) + payload + JPEG_IMAGE_DATA
+
+
+def tiff_without_makernote() -> bytes:
+    """Return a big-endian TIFF block with an EXIF IFD that has no MakerNote"""
+    # IFD0 at offset 8 with a single entry pointing to the EXIF IFD at offset 26
+    ifd0 = struct.pack(">HHHII", 1, 0x8769, 4, 1, 26) + struct.pack(">I", 0)
+    # EXIF IFD with just the ExifVersion tag
+    exif_ifd = struct.pack(">HHHI4s", 1, 0x9000, 7, 4, b"0232") + struct.pack(">I", 0)
+    return b"MM\x00\x2a" + struct.pack(">I", 8) + ifd0 + exif_ifd
+
+
+def test_write_asset_id_to_jpeg(tmp_path):
+    """Test writing the asset id to a JPEG with no MakerNote and then to its new Apple MakerNote"""
+    test_image = tmp_path / TEST_IMAGE.name
+    shutil.copy2(TEST_IMAGE, test_image)
+    assert read_asset_id_from_image(test_image) is None
+
+    write_asset_id_to_image(test_image, ASSET_ID)
+    assert read_asset_id_from_image(test_image) == ASSET_ID
+
+    # the second write replaces the asset id in the existing Apple MakerNote
+    size = os.path.getsize(test_image)
+    write_asset_id_to_image(test_image, ASSET_ID_2)
+    assert read_asset_id_from_image(test_image) == ASSET_ID_2
+    assert os.path.getsize(test_image) == size
+
+    # the compressed image data is unchanged
+    image_data_before = TEST_IMAGE.read_bytes()
+    image_data_after = test_image.read_bytes()
+    assert image_data_before[image_data_before.index(b"\xff\xda") :] == image_data_after[image_data_after.index(b"\xff\xda") :]
+
+
+def test_write_asset_id_to_jpeg_minimal(tmp_path):
+    """Test writing the asset id to a minimal JPEG whose EXIF IFD has no MakerNote"""
+    test_image = tmp_path / "minimal.jpeg"
+    test_image.write_bytes(jpeg_with_tiff(tiff_without_makernote()))
+    write_asset_id_to_image(test_image, ASSET_ID)
+    assert read_asset_id_from_image(test_image) == ASSET_ID
+    assert test_image.read_bytes().endswith(JPEG_IMAGE_DATA)
+
+
+def test_write_asset_id_to_heic(tmp_path):
+    """Test writing the asset id to a HEIC with the Exif item relocated and then in place"""
+    test_image = tmp_path / TEST_IMAGE_HEIC.name
+    shutil.copy2(TEST_IMAGE_HEIC, test_image)
+    assert read_asset_id_from_image(test_image) is None
+
+    # the new MakerNote does not fit in the existing Exif item so the item is moved to the end of the file
+    size = os.path.getsize(test_image)
+    write_asset_id_to_image(test_image, ASSET_ID)
+    assert read_asset_id_from_image(test_image) == ASSET_ID
+    assert os.path.getsize(test_image) > size
+
+    # an asset id of the same length fits in the relocated Exif item
+    size = os.path.getsize(test_image)
+    write_asset_id_to_image(test_image, ASSET_ID_2)
+    assert read_asset_id_from_image(test_image) == ASSET_ID_2
+    assert os.path.getsize(test_image) == size
+
+
+def test_write_asset_id_to_jpeg_no_exif(tmp_path):
+    """Test that a JPEG with no EXIF segment raises ExifError and is left unchanged"""
+    test_image = tmp_path / "no_exif.jpeg"
+    test_image.write_bytes(b"\xff\xd8" + JPEG_IMAGE_DATA)
+    with pytest.raises(ExifError):
+        write_asset_id_to_image(test_image, ASSET_ID)
+    with pytest.raises(ExifError):
+        read_asset_id_from_image(test_image)
+    assert test_image.read_bytes() == b"\xff\xd8" + JPEG_IMAGE_DATA
+
+
+@pytest.mark.parametrize("size", [10, 20, 30, 40])
+def test_write_asset_id_to_jpeg_truncated(size, tmp_path):
+    """Test that a truncated TIFF block raises ExifError"""
+    test_image = tmp_path / "truncated.jpeg"
+    test_image.write_bytes(jpeg_with_tiff(tiff_without_makernote()[:size]))
+    with pytest.raises(ExifError):
+        write_asset_id_to_image(test_image, ASSET_ID)
+
+
+def test_write_asset_id_to_image_not_image(tmp_path):
+    """Test that a file that is not a JPEG or HEIC raises ExifError"""
+    test_file = tmp_path / "test.txt"
+    test_file.write_text("not an image")
+    with pytest.raises(ExifError):
+        write_asset_id_to_image(test_file, ASSET_ID)
@@ -2,11 +2,12 @@
 
 from __future__ import annotations
 
-import json
 import os
 import pathlib
+import plistlib
 import shutil
 import subprocess
+import tempfile
 import uuid
 from functools import cache
 from typing import Any
@@ -18,9 +19,20 @@ from makelive import (
     is_live_photo_pair,
     live_id,
     make_live_photo,
+    make_live_photos,
     save_live_photo_pair_as_pvt,
 )
-from makelive.__main__ import main
+from makelive.__main__ import find_photo_video_pairs, main
+from makelive.exif import ExifError
+from makelive.fileutil import clone_or_copy
+from makelive.makelive import export_quicktime_file_with_asset_id
+from makelive.quicktime import QuickTimeError
+
+try:
+    # orjson parses the exiftool output faster if it is installed
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
 
 TEST_IMAGE: pathlib.Path = pathlib.Path("tests/test.jpeg")
 TEST_VIDEO_MP4: pathlib.Path = pathlib.Path("tests/test.mp4")
@@ -29,6 +41,19 @@ TEST_VIDEO_MOV: pathlib.Path = pathlib.Path("tests/test.mov")
 TEST_IMAGE_HEIC: pathlib.Path = pathlib.Path("tests/test2.heic")
 TEST_VIDEO_HEIC: pathlib.Path = pathlib.Path("tests/test2.mov")
 
+# metadata keys that change between runs
+IGNORED_METADATA_KEYS = frozenset(
+    {
+        "File:FileModifyDate",
+        "File:FileAccessDate",
+        "File:FileInodeChangeDate",
+        "File:CurrentIPTCDigest",
+        "Photoshop:IPTCDigest",
+        "XMP:XMPToolkit",
+        "MakerNotes:ContentIdentifier",
+    }
+)
+
 
 @cache
 def get_exiftool_path():
@@ -36,34 +61,114 @@ def get_exiftool_path():
     return shutil.which("exiftool")
 
 
-def get_metadata_with_exiftool(file_path: str) -> dict:
-    process = subprocess.Popen(
-        ["exiftool", "-j", "-G", file_path],
-        stdout=subprocess.PIPE,
-        stderr=subprocess.STDOUT,
-    )
-    stdout, stderr = process.communicate()
+class ExifToolSession:
+    """A single exiftool process kept open with -stay_open to read metadata for many files"""
+
+    def __init__(self, exiftool_path: str):
+        # stderr goes to a temporary file rather than a pipe so it cannot fill up and block exiftool
+        self._stderr = tempfile.TemporaryFile()  # noqa: SIM115 (closed by close)
+        self._process = subprocess.Popen(
+            # -n skips converting values to human readable form; -q -q silences messages and warnings
+            [exiftool_path, "-stay_open", "True", "-@", "-", "-common_args", "-j", "-G", "-n", "-q", "-q"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=self._stderr,
+        )
+
+    def _exited_error(self) -> RuntimeError:
+        """Return an error with the return code and stderr output of the exited exiftool process"""
+        return_code = self._process.wait()
+        self._stderr.seek(0)
+        stderr = self._stderr.read().decode("utf-8", errors="replace").strip()
+        return RuntimeError(f"exiftool exited with return code {return_code}: {stderr}")
+
+    def metadata(self, *file_paths: str | os.PathLike) -> list[dict[str, Any]]:
+        """Return the metadata for file_paths as a list of dicts in the same order"""
+        args = [os.fspath(file_path) for file_path in file_paths] + ["-execute", ""]
+        try:
+            self._process.stdin.write("\n".join(args).encode("utf-8"))
+            self._process.stdin.flush()
+        except BrokenPipeError as e:
+            raise self._exited_error() from e
+
+        # exiftool writes {ready} on a line by itself when it has finished the command
+        output = bytearray()
+        while (line := self._process.stdout.readline()).rstrip() != b"{ready}":
+            if not line:
+                raise self._exited_error()
+            output += line
+        return json_loads(output)
+
+    def close(self):
+        """Tell exiftool to exit and wait for it"""
+        self._process.stdin.write(b"-stay_open\nFalse\n")
+        self._process.stdin.flush()
+        self._process.wait()
+        self._stderr.close()
+
+
+@cache
+def get_exiftool_session() -> ExifToolSession:
+    """Return the exiftool session shared by all tests"""
+    return ExifToolSession(get_exiftool_path())
 
+
+@pytest.fixture(scope="session", autouse=True)
+def _close_exiftool_session():
+    """Close the shared exiftool session, if one was started, at the end of the test session"""
+    yield
+    if get_exiftool_session.cache_info().currsize:
+        get_exiftool_session().close()
+
+
+def get_metadata_with_exiftool(file_path: str | os.PathLike) -> dict[str, Any]:
+    """Return the metadata for file_path read with exiftool"""
     # ExifTool always returns a json array (even when there is just one item)
-    metadata = json.loads(stdout)[0]
-    return metadata
+    return get_exiftool_session().metadata(file_path)[0]
+
+
+def get_metadata_with_exiftool_many(file_paths: list[str | os.PathLike]) -> dict[str, dict[str, Any]]:
+    """Return the metadata for all of file_paths, read with a single exiftool command, keyed by path"""
+    metadata = {os.path.abspath(md["SourceFile"]): md for md in get_exiftool_session().metadata(*file_paths)}
+    return {os.fspath(file_path): metadata[os.path.abspath(file_path)] for file_path in file_paths}
+
+
+@pytest.fixture(scope="session")
+def runner() -> CliRunner:
+    """CliRunner shared by the CLI tests"""
+    return CliRunner()
+
+
+@pytest.fixture(scope="session")
+def baseline_metadata() -> dict[pathlib.Path, dict[str, Any]]:
+    """Metadata of the unmodified test images, read once per test session"""
+    return dict(zip([TEST_IMAGE, TEST_IMAGE_HEIC], get_exiftool_session().metadata(TEST_IMAGE, TEST_IMAGE_HEIC)))
 
 
 def copy_test_images(
     filepath: str | os.PathLike,
 ) -> tuple[str, str, str]:
-    """Copy test images to a new location"""
+    """Copy test images, including the MP4 video, to a new location
+
+    The files are cloned (copy-on-write) where the file system supports it; they are never hard linked
+    because the tests modify the copies in place.
+    """
+    test_image, test_video = copy_test_images_jpeg(filepath)
     filepath = pathlib.Path(filepath)
+    clone_or_copy(TEST_VIDEO_MP4, filepath / TEST_VIDEO_MP4.name)
+    return test_image, test_video, str(filepath / TEST_VIDEO_MP4.name)
 
-    shutil.copyfile(TEST_IMAGE, filepath / TEST_IMAGE.name)
-    shutil.copyfile(TEST_VIDEO_MP4, filepath / TEST_VIDEO_MP4.name)
-    shutil.copyfile(TEST_VIDEO_MOV, filepath / TEST_VIDEO_MOV.name)
 
-    return (
-        str(filepath / TEST_IMAGE.name),
-        str(filepath / TEST_VIDEO_MOV.name),
-        str(filepath / TEST_VIDEO_MP4.name),
-    )
+def copy_test_images_jpeg(
+    filepath: str | os.PathLike,
+) -> tuple[str, str]:
+    """Copy the JPEG test image and MOV test video to a new location"""
+    filepath = pathlib.Path(filepath)
+
+    clone_or_copy(TEST_IMAGE, filepath / TEST_IMAGE.name)
+    clone_or_copy(TEST_VIDEO_MOV, filepath / TEST_VIDEO_MOV.name)
+
+    return str(filepath / TEST_IMAGE.name), str(filepath / TEST_VIDEO_MOV.name)
 
 
 def copy_test_images_heic(
@@ -72,39 +177,28 @@ def copy_test_images_heic(
     """Copy test images to a new location"""
     filepath = pathlib.Path(filepath)
 
-    shutil.copyfile(TEST_IMAGE_HEIC, filepath / TEST_IMAGE_HEIC.name)
-    shutil.copyfile(TEST_VIDEO_HEIC, filepath / TEST_VIDEO_HEIC.name)
+    clone_or_copy(TEST_IMAGE_HEIC, filepath / TEST_IMAGE_HEIC.name)
+    clone_or_copy(TEST_VIDEO_HEIC, filepath / TEST_VIDEO_HEIC.name)
 
     return str(filepath / TEST_IMAGE_HEIC.name), str(filepath / TEST_VIDEO_HEIC.name)
 
 
 def clean_metadata_dict(metadata: dict[str, Any]) -> dict[str, Any]:
     """Clean out metadata that we don't care about because it changes between runs"""
-    metadata = metadata.copy()
-    for key in [
-        "File:FileModifyDate",
-        "File:FileAccessDate",
-        "File:FileInodeChangeDate",
-        "File:CurrentIPTCDigest",
-    ]:
-        if key in metadata:
-            del metadata[key]
-    for key in [
-        "Photoshop:IPTCDigest",
-        "XMP:XMPToolkit",
-        "MakerNotes:ContentIdentifier",
-    ]:
-        if key in metadata:
-            del metadata[key]
-    return metadata
+    return {key: value for key, value in metadata.items() if key not in IGNORED_METADATA_KEYS}
 
 
+@pytest.mark.parametrize(
+    "copy_images,test_image_source",
+    [(copy_test_images_jpeg, TEST_IMAGE), (copy_test_images_heic, TEST_IMAGE_HEIC)],
+    ids=["jpeg", "heic"],
+)
 @pytest.mark.skipif(get_exiftool_path() is None, reason="exiftool not found")
-def test_make_live_photo_image(tmp_path):
-    """Test make_live_photo with an image"""
+def test_make_live_photo_image(copy_images, test_image_source, tmp_path, baseline_metadata):
+    """Test make_live_photo with a JPEG or HEIC image"""
 
-    test_image, test_video, _ = copy_test_images(tmp_path)
-    metadata_before = get_metadata_with_exiftool(test_image)
+    test_image, test_video = copy_images(tmp_path)
+    metadata_before = baseline_metadata[test_image_source]
     asset_id = make_live_photo(test_image, test_video)
     metadata_after = get_metadata_with_exiftool(test_image)
     assert asset_id == metadata_after["MakerNotes:ContentIdentifier"]
@@ -112,36 +206,36 @@ def test_make_live_photo_image(tmp_path):
         assert metadata_before.get(key, None) == metadata_after.get(key, None)
 
 
+def test_make_live_photo_image_data_unchanged(tmp_path):
+    """Test make_live_photo does not modify the compressed image data of a JPEG"""
+
+    test_image, test_video = copy_test_images_jpeg(tmp_path)
+    make_live_photo(test_image, test_video)
+    image_data_before = TEST_IMAGE.read_bytes()
+    image_data_after = pathlib.Path(test_image).read_bytes()
+    # compare everything from the JPEG start of scan marker to the end of the file
+    assert image_data_before[image_data_before.index(b"\xff\xda") :] == image_data_after[image_data_after.index(b"\xff\xda") :]
+
+
 @pytest.mark.skipif(get_exiftool_path() is None, reason="exiftool not found")
-def test_make_live_photo_image_heic(tmp_path):
-    """Test make_live_photo with a HEIC image"""
+def test_make_live_photo_image_core_graphics(tmp_path, monkeypatch, baseline_metadata):
+    """Test make_live_photo falls back to Core Graphics when the EXIF block cannot be edited directly"""
 
-    test_image, test_video = copy_test_images_heic(tmp_path)
-    metadata_before = get_metadata_with_exiftool(test_image)
+    def write_asset_id_to_image(filepath, asset_id):
+        raise ExifError("Truncated EXIF data")
+
+    monkeypatch.setattr("makelive.makelive.write_asset_id_to_image", write_asset_id_to_image)
+    test_image, test_video = copy_test_images_jpeg(tmp_path)
     asset_id = make_live_photo(test_image, test_video)
     metadata_after = get_metadata_with_exiftool(test_image)
     assert asset_id == metadata_after["MakerNotes:ContentIdentifier"]
+    assert live_id(test_image) == asset_id
+    # only the MakerApple dictionary is passed to Core Graphics; the rest of the metadata is kept from the source
+    metadata_before = baseline_metadata[TEST_IMAGE]
     for key in ["EXIF:ImageDescription", "XMP:Subject", "IPTC:Keywords"]:
         assert metadata_before.get(key, None) == metadata_after.get(key, None)
 
 
-# @pytest.mark.skipif(get_exiftool_path() is None, reason="exiftool not found")
-# def test_make_live_photo_image_heic_no_dict(tmp_path):
-#     """Test make_live_photo with a HEIC image that has no metadata dict"""
-#     # the code isn't currently able to handle this case
-#     test_image, test_video = copy_test_images_heic(tmp_path)
-#     # wipe the metadata dict with exiftool -all= test_image
-#     process = subprocess.Popen(
-#         ["exiftool", "-all=", test_image],
-#         stdout=subprocess.PIPE,
-#         stderr=subprocess.STDOUT,
-#     )
-#     stdout, stderr = process.communicate()
-#     asset_id = make_live_photo(test_image, test_video)
-#     metadata_after = get_metadata_with_exiftool(test_image)
-#     assert asset_id == metadata_after["MakerNotes:ContentIdentifier"]
-
-
 @pytest.mark.parametrize("video", [TEST_VIDEO_MP4, TEST_VIDEO_MOV])
 @pytest.mark.skipif(get_exiftool_path() is None, reason="exiftool not found")
 def test_make_live_photo_video(video, tmp_path):
@@ -149,32 +243,120 @@ def test_make_live_photo_video(video, tmp_path):
 
     test_image, _, _ = copy_test_images(tmp_path)
     test_video = tmp_path / video.name
-    asset_id = make_live_photo(test_image, test_video)
+    # the test videos already have a content identifier so pass a new asset id to force the video to be written
+    user_asset_id = str(uuid.uuid4()).upper()
+    asset_id = make_live_photo(test_image, test_video, asset_id=user_asset_id)
     metadata_after = get_metadata_with_exiftool(test_video)
+    assert asset_id == user_asset_id
     assert asset_id == metadata_after["QuickTime:ContentIdentifier"]
 
     # Note: do not test the other metadata because it is not currently preserved
 
 
+@pytest.mark.parametrize("video", [TEST_VIDEO_MP4, TEST_VIDEO_MOV])
+@pytest.mark.skipif(get_exiftool_path() is None, reason="exiftool not found")
+def test_make_live_photo_video_av_foundation(video, tmp_path, monkeypatch):
+    """Test make_live_photo falls back to exporting the video with AV Foundation when the metadata cannot be edited directly"""
+
+    def write_asset_id_to_quicktime(filepath, asset_id):
+        raise QuickTimeError("meta atom is not QuickTime metadata")
+
+    exported = []
+
+    def export_quicktime_file(filepath, asset_id):
+        exported.append(filepath)
+        return export_quicktime_file_with_asset_id(filepath, asset_id)
+
+    monkeypatch.setattr("makelive.makelive.write_asset_id_to_quicktime", write_asset_id_to_quicktime)
+    monkeypatch.setattr("makelive.makelive.export_quicktime_file_with_asset_id", export_quicktime_file)
+    test_image, _, _ = copy_test_images(tmp_path)
+    test_video = tmp_path / video.name
+    # the test videos already have a content identifier so pass a new asset id to force the video to be written
+    user_asset_id = str(uuid.uuid4()).upper()
+    asset_id = make_live_photo(test_image, test_video, asset_id=user_asset_id)
+    assert exported == [str(test_video)]
+    metadata_after = get_metadata_with_exiftool(test_video)
+    assert asset_id == user_asset_id
+    assert asset_id == metadata_after["QuickTime:ContentIdentifier"]
+    assert live_id(test_video) == asset_id
+
+
 @pytest.mark.skipif(get_exiftool_path() is None, reason="exiftool not found")
 def test_make_live_photo_asset_id(tmp_path):
     """Test the make_live_photo() function with a user-provided asset ID"""
 
-    test_image, test_video, _ = copy_test_images(tmp_path)
+    test_image, test_video = copy_test_images_jpeg(tmp_path)
     user_asset_id = str(uuid.uuid4()).upper()
     asset_id = make_live_photo(test_image, test_video, asset_id=user_asset_id)
-    metadata_after = get_metadata_with_exiftool(test_image)
+    metadata_after = get_metadata_with_exiftool_many([test_image, test_video])
     assert asset_id == user_asset_id
-    assert asset_id == metadata_after["MakerNotes:ContentIdentifier"]
-    metadata_after = get_metadata_with_exiftool(test_video)
-    assert asset_id == metadata_after["QuickTime:ContentIdentifier"]
+    assert asset_id == metadata_after[test_image]["MakerNotes:ContentIdentifier"]
+    assert asset_id == metadata_after[test_video]["QuickTime:ContentIdentifier"]
+
+
+def test_make_live_photo_already_live(tmp_path):
+    """Test make_live_photo does not rewrite a pair that is already a Live Photo"""
+
+    test_image, test_video = copy_test_images_jpeg(tmp_path)
+    asset_id = make_live_photo(test_image, test_video)
+    mtimes = os.stat(test_image).st_mtime_ns, os.stat(test_video).st_mtime_ns
+    assert make_live_photo(test_image, test_video) == asset_id
+    assert make_live_photo(test_image, test_video, asset_id=asset_id) == asset_id
+    assert (os.stat(test_image).st_mtime_ns, os.stat(test_video).st_mtime_ns) == mtimes
+
+
+@pytest.mark.skipif(get_exiftool_path() is None, reason="exiftool not found")
+def test_make_live_photos(tmp_path):
+    """Test make_live_photos with several pairs and a bad pair"""
+
+    test_image, test_video, test_video_mp4 = copy_test_images(tmp_path)
+    test_image_heic, test_video_heic = copy_test_images_heic(tmp_path)
+    user_asset_id = str(uuid.uuid4()).upper()
+    results = make_live_photos(
+        [
+            (test_image, test_video),
+            (test_image_heic, test_video_heic, user_asset_id),
+            (test_video_mp4, test_image),
+        ]
+    )
+    assert len(results) == 3
+    metadata_after = get_metadata_with_exiftool_many([test_image, test_video, test_image_heic, test_video_heic])
+    asset_id, error = results[0]
+    assert error is None
+    assert metadata_after[test_image]["MakerNotes:ContentIdentifier"] == asset_id
+    assert metadata_after[test_video]["QuickTime:ContentIdentifier"] == asset_id
+    assert results[1] == (user_asset_id, None)
+    assert metadata_after[test_image_heic]["MakerNotes:ContentIdentifier"] == user_asset_id
+    assert metadata_after[test_video_heic]["QuickTime:ContentIdentifier"] == user_asset_id
+    asset_id, error = results[2]
+    assert asset_id is None
+    assert isinstance(error, ValueError)
+
+
+def test_make_live_photos_export_error(tmp_path, monkeypatch):
+    """Test make_live_photos returns the error when the AV Foundation export of the video fails"""
+
+    def write_asset_id_to_quicktime(filepath, asset_id):
+        raise QuickTimeError("meta atom is not QuickTime metadata")
+
+    def export_quicktime_file(filepath, asset_id):
+        return "Export failed"
+
+    monkeypatch.setattr("makelive.makelive.write_asset_id_to_quicktime", write_asset_id_to_quicktime)
+    monkeypatch.setattr("makelive.makelive.export_quicktime_file_with_asset_id", export_quicktime_file)
+    test_image, test_video = copy_test_images_heic(tmp_path)
+    # a single pair is processed in this process so the patched functions are used
+    ((asset_id, error),) = make_live_photos([(test_image, test_video)])
+    assert asset_id is None
+    assert isinstance(error, OSError)
+    assert "Export failed" in str(error)
 
 
 @pytest.mark.skipif(get_exiftool_path() is None, reason="exiftool not found")
 def test_is_live_photo_pair(tmp_path):
     """Test is_live_photo_pair with an image"""
 
-    test_image, test_video, _ = copy_test_images(tmp_path)
+    test_image, test_video = copy_test_images_jpeg(tmp_path)
     assert not is_live_photo_pair(test_image, test_video)
     asset_id = make_live_photo(test_image, test_video)
     assert is_live_photo_pair(test_image, test_video) == asset_id
@@ -184,7 +366,7 @@ def test_is_live_photo_pair(tmp_path):
 def test_live_id(tmp_path):
     """Test live_id with an image"""
 
-    test_image, test_video, _ = copy_test_images(tmp_path)
+    test_image, test_video = copy_test_images_jpeg(tmp_path)
     assert not live_id(test_image)
     asset_id = make_live_photo(test_image, test_video)
     assert live_id(test_image) == asset_id
@@ -194,12 +376,15 @@ def test_live_id(tmp_path):
 def test_save_live_photo_pair_as_pvt(tmp_path):
     """Test the save_live_photo_pair_as_pvt() function"""
 
-    test_image, test_video, _ = copy_test_images(tmp_path)
+    test_image, test_video = copy_test_images_jpeg(tmp_path)
     asset_id, pvt_file = save_live_photo_pair_as_pvt(test_image, test_video)
-    metadata_after = get_metadata_with_exiftool(pvt_file / pathlib.Path(test_image).name)
-    assert asset_id == metadata_after["MakerNotes:ContentIdentifier"]
-    metadata_after = get_metadata_with_exiftool(pvt_file / pathlib.Path(test_video).name)
-    assert asset_id == metadata_after["QuickTime:ContentIdentifier"]
+    pvt_image = str(pvt_file / pathlib.Path(test_image).name)
+    pvt_video = str(pvt_file / pathlib.Path(test_video).name)
+    metadata_after = get_metadata_with_exiftool_many([pvt_image, pvt_video])
+    assert asset_id == metadata_after[pvt_image]["MakerNotes:ContentIdentifier"]
+    assert asset_id == metadata_after[pvt_video]["QuickTime:ContentIdentifier"]
+    with open(pvt_file / "metadata.plist", "rb") as metadata_file:
+        assert plistlib.load(metadata_file) == {"PFVideoComplementMetadataVersionKey": "1"}
 
     # verify originals were not modified
     assert not is_live_photo_pair(test_image, test_video)
@@ -209,45 +394,54 @@ def test_save_live_photo_pair_as_pvt(tmp_path):
 def test_save_live_photo_pair_as_pvt_asset_id(tmp_path):
     """Test the save_live_photo_pair_as_pvt() function with user supplied asset_id"""
 
-    test_image, test_video, _ = copy_test_images(tmp_path)
+    test_image, test_video = copy_test_images_jpeg(tmp_path)
     user_asset_id = str(uuid.uuid4()).upper()
     asset_id, pvt_file = save_live_photo_pair_as_pvt(test_image, test_video, asset_id=user_asset_id)
-    metadata_after = get_metadata_with_exiftool(pvt_file / pathlib.Path(test_image).name)
+    pvt_image = str(pvt_file / pathlib.Path(test_image).name)
+    pvt_video = str(pvt_file / pathlib.Path(test_video).name)
+    metadata_after = get_metadata_with_exiftool_many([pvt_image, pvt_video])
     assert asset_id == user_asset_id
-    assert user_asset_id == metadata_after["MakerNotes:ContentIdentifier"]
-    metadata_after = get_metadata_with_exiftool(pvt_file / pathlib.Path(test_video).name)
-    assert user_asset_id == metadata_after["QuickTime:ContentIdentifier"]
+    assert user_asset_id == metadata_after[pvt_image]["MakerNotes:ContentIdentifier"]
+    assert user_asset_id == metadata_after[pvt_video]["QuickTime:ContentIdentifier"]
 
 
 @pytest.mark.skipif(get_exiftool_path() is None, reason="exiftool not found")
 def test_save_live_photo_pair_as_pvt_pvt_path(tmp_path):
     """Test the save_live_photo_pair_as_pvt() function with user supplied pvt_path"""
 
-    test_image, test_video, _ = copy_test_images(tmp_path)
+    test_image, test_video = copy_test_images_jpeg(tmp_path)
     asset_id, pvt_file = save_live_photo_pair_as_pvt(test_image, test_video, pvt_path=tmp_path)
-    metadata_after = get_metadata_with_exiftool(pvt_file / pathlib.Path(test_image).name)
-    assert asset_id == metadata_after["MakerNotes:ContentIdentifier"]
-    metadata_after = get_metadata_with_exiftool(pvt_file / pathlib.Path(test_video).name)
-    assert asset_id == metadata_after["QuickTime:ContentIdentifier"]
+    pvt_image = str(pvt_file / pathlib.Path(test_image).name)
+    pvt_video = str(pvt_file / pathlib.Path(test_video).name)
+    metadata_after = get_metadata_with_exiftool_many([pvt_image, pvt_video])
+    assert asset_id == metadata_after[pvt_image]["MakerNotes:ContentIdentifier"]
+    assert asset_id == metadata_after[pvt_video]["QuickTime:ContentIdentifier"]
+
 
+def test_find_photo_video_pairs(tmp_path):
+    """Test find_photo_video_pairs matches files by stem"""
 
-def test_cli_manual(tmp_path):
+    files = [tmp_path / name for name in ["a.jpg", "a.MOV", "b.heic", "c.mp4", "d.txt"]]
+    matched, unmatched = find_photo_video_pairs(files)
+    assert matched == [(files[0], files[1])]
+    assert sorted(unmatched) == sorted([files[2], files[3]])
+
+
+def test_cli_manual(tmp_path, runner):
     """Test the CLI with --manual"""
 
-    test_image, test_video, _ = copy_test_images(tmp_path)
+    test_image, test_video = copy_test_images_jpeg(tmp_path)
 
-    runner = CliRunner()
     results = runner.invoke(main, ["--verbose", "--manual", test_image, test_video])
     assert results.exit_code == 0
     assert "Wrote asset ID" in results.output
 
 
-def test_cli_manual_pvt(tmp_path):
+def test_cli_manual_pvt(tmp_path, runner):
     """Test the CLI with --manual --pvt"""
 
-    test_image, test_video, _ = copy_test_images(tmp_path)
+    test_image, test_video = copy_test_images_jpeg(tmp_path)
 
-    runner = CliRunner()
     results = runner.invoke(main, ["--verbose", "--pvt", "--manual", test_image, test_video])
     assert results.exit_code == 0
     assert "Wrote asset ID" in results.output
@@ -259,25 +453,37 @@ def test_cli_manual_pvt(tmp_path):
     assert pvt_file.is_file()
 
 
-def test_cli_files(tmp_path):
+def test_cli_files(tmp_path, runner):
     """Test the CLI with FILES argument"""
 
-    copy_test_images(tmp_path)
-
-    files = [str(f) for f in tmp_path.glob("*")]
-    runner = CliRunner()
+    files = list(copy_test_images(tmp_path))
     results = runner.invoke(main, ["--verbose", *files])
     assert results.exit_code == 0
     assert "Wrote asset ID" in results.output
 
 
-def test_cli_files_pvt(tmp_path):
-    """Test the CLI with FILES argument and --pvt"""
+def test_cli_files_jobs(tmp_path, runner):
+    """Test the CLI with multiple pairs in FILES argument processed in parallel"""
+
+    files = [*copy_test_images_jpeg(tmp_path), *copy_test_images_heic(tmp_path)]
+    results = runner.invoke(main, ["--verbose", "--jobs", "2", *files])
+    assert results.exit_code == 0
+    assert results.output.count("Wrote asset ID") == 2
 
-    copy_test_images_heic(tmp_path)
 
-    files = [str(f) for f in tmp_path.glob("*")]
-    runner = CliRunner()
+def test_cli_manual_and_files_duplicate(tmp_path, runner):
+    """Test the CLI processes a pair given both with --manual and in FILES only once"""
+
+    test_image, test_video = copy_test_images_jpeg(tmp_path)
+    results = runner.invoke(main, ["--verbose", "--jobs", "2", "--manual", test_image, test_video, test_image, test_video])
+    assert results.exit_code == 0
+    assert results.output.count("Wrote asset ID") == 1
+
+
+def test_cli_files_pvt(tmp_path, runner):
+    """Test the CLI with FILES argument and --pvt"""
+
+    files = list(copy_test_images_heic(tmp_path))
     results = runner.invoke(main, ["--verbose", "--pvt", *files])
     assert results.exit_code == 0
     assert "Wrote asset ID" in results.output
@@ -289,32 +495,29 @@ def test_cli_files_pvt(tmp_path):
     assert pvt_file.is_file()
 
 
-def test_cli_bad_files(tmp_path):
+def test_cli_bad_files(tmp_path, runner):
     """Test the CLI with --manual and incorrect files"""
 
-    test_image, test_video, _ = copy_test_images(tmp_path)
+    test_image, test_video = copy_test_images_jpeg(tmp_path)
 
-    runner = CliRunner()
     results = runner.invoke(main, ["--verbose", "--manual", test_video, test_image])
     assert results.exit_code != 0
     assert "is not a JPEG or HEIC" in results.output
 
 
-def test_cli_no_files():
+def test_cli_no_files(runner):
     """Test the CLI with no files"""
 
-    runner = CliRunner()
     results = runner.invoke(main, ["--verbose"])
     assert results.exit_code != 0
     assert "No files specified" in results.output
 
 
-def test_cli_check(tmp_path):
+def test_cli_check(tmp_path, runner):
     """Test CLI with --check"""
 
-    test_image, test_video, _ = copy_test_images(tmp_path)
+    test_image, test_video = copy_test_images_jpeg(tmp_path)
 
-    runner = CliRunner()
     results = runner.invoke(main, ["--check", str(test_image), str(test_video)])
     assert results.exit_code == 0
     assert "are not Live Photos" in results.output
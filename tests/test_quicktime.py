@@ -0,0 +1,122 @@
+"""Test quicktime.py"""
+
+from __future__ import annotations
+
+import os
+import pathlib
+import shutil
+import struct
+
+import pytest
+
+from makelive.quicktime import (
+    QuickTimeError,
+    meta_with_asset_id,
+    read_asset_id_from_quicktime,
+    write_asset_id_to_quicktime,
+)
+
+TEST_VIDEO_MP4: pathlib.Path = pathlib.Path("tests/test.mp4")
+TEST_VIDEO_MOV: pathlib.Path = pathlib.Path("tests/test.mov")
+TEST_VIDEO_HEIC: pathlib.Path = pathlib.Path("tests/test2.mov")
+
+ASSET_ID = "B8D41CCF-1F4E-49DF-8539-523493120134"
+
+
+def atom(atom_type: bytes, payload: bytes) -> bytes:
+    """Return a serialized atom"""
+    return struct.pack(">I4s", 8 + len(payload), atom_type) + payload
+
+
+MDAT = atom(b"mdat", b"movie data")
+
+
+def hdlr_atom(handler_type: bytes) -> bytes:
+    """Return a hdlr atom for handler_type"""
+    return atom(b"hdlr", bytes(8) + handler_type + bytes(14))
+
+
+def movie(*moov_children: bytes) -> bytes:
+    """Return a minimal movie with the moov atom before the media data"""
+    return atom(b"ftyp", b"qt  \x00\x00\x00\x00qt  ") + atom(b"moov", b"".join(moov_children)) + MDAT
+
+
+@pytest.mark.parametrize(
+    "video,asset_id",
+    [
+        (TEST_VIDEO_MOV, "B8D41CCF-1F4E-49DF-8539-523493120134"),
+        (TEST_VIDEO_MP4, "2C804E44-1972-4551-83EF-92E0C0A9CB31"),
+        (TEST_VIDEO_HEIC, None),
+    ],
+)
+def test_read_asset_id_from_quicktime(video, asset_id):
+    """Test reading the content identifier of the test videos"""
+    assert read_asset_id_from_quicktime(video) == asset_id
+
+
+@pytest.mark.parametrize("video", [TEST_VIDEO_MP4, TEST_VIDEO_MOV, TEST_VIDEO_HEIC])
+def test_write_asset_id_to_quicktime(video, tmp_path):
+    """Test writing the content identifier to the test videos"""
+    test_video = tmp_path / video.name
+    shutil.copy2(video, test_video)
+    write_asset_id_to_quicktime(test_video, ASSET_ID)
+    assert read_asset_id_from_quicktime(test_video) == ASSET_ID
+
+    # writing a different id replaces the existing content identifier
+    write_asset_id_to_quicktime(test_video, "short")
+    assert read_asset_id_from_quicktime(test_video) == "short"
+
+    # no temporary files are left behind
+    assert os.listdir(tmp_path) == [video.name]
+
+
+def test_write_asset_id_to_quicktime_no_meta(tmp_path):
+    """Test writing the content identifier to a movie with no metadata"""
+    test_video = tmp_path / "no_meta.mov"
+    test_video.write_bytes(movie(atom(b"mvhd", bytes(100))))
+    assert read_asset_id_from_quicktime(test_video) is None
+    write_asset_id_to_quicktime(test_video, ASSET_ID)
+    assert read_asset_id_from_quicktime(test_video) == ASSET_ID
+    # the media data is never moved
+    assert test_video.read_bytes().index(MDAT) == movie(atom(b"mvhd", bytes(100))).index(MDAT)
+
+
+def test_write_asset_id_to_quicktime_open_ended_mdat(tmp_path):
+    """Test writing the content identifier to a movie whose mdat atom has size 0 (extends to the end of the file)"""
+    mdat = struct.pack(">I4s", 0, b"mdat") + b"movie data"
+    data = atom(b"ftyp", b"qt  \x00\x00\x00\x00qt  ") + atom(b"moov", atom(b"mvhd", bytes(100))) + mdat
+    test_video = tmp_path / "open_ended.mov"
+    test_video.write_bytes(data)
+    write_asset_id_to_quicktime(test_video, ASSET_ID)
+    assert read_asset_id_from_quicktime(test_video) == ASSET_ID
+    # the mdat atom now has an explicit size and is followed by the new moov atom
+    new_data = test_video.read_bytes()
+    mdat_start = data.index(mdat)
+    assert new_data[mdat_start : mdat_start + len(mdat)] == atom(b"mdat", b"movie data")
+    assert new_data[mdat_start + len(mdat) + 4 : mdat_start + len(mdat) + 8] == b"moov"
+
+
+def test_write_asset_id_to_quicktime_not_mdta(tmp_path):
+    """Test that a meta atom that is not QuickTime metadata raises QuickTimeError and leaves the movie unchanged"""
+    data = movie(atom(b"mvhd", bytes(100)), atom(b"meta", bytes(4) + hdlr_atom(b"mdir")))
+    test_video = tmp_path / "mdir.mov"
+    test_video.write_bytes(data)
+    with pytest.raises(QuickTimeError):
+        write_asset_id_to_quicktime(test_video, ASSET_ID)
+    with pytest.raises(QuickTimeError):
+        read_asset_id_from_quicktime(test_video)
+    assert test_video.read_bytes() == data
+
+
+def test_meta_with_asset_id_not_mdta():
+    """Test that meta_with_asset_id raises QuickTimeError for a meta atom with a handler other than mdta"""
+    with pytest.raises(QuickTimeError):
+        meta_with_asset_id(atom(b"meta", hdlr_atom(b"mdir")), ASSET_ID)
+
+
+def test_write_asset_id_to_quicktime_empty(tmp_path):
+    """Test that an empty file raises QuickTimeError"""
+    test_video = tmp_path / "empty.mov"
+    test_video.touch()
+    with pytest.raises(QuickTimeError):
+        write_asset_id_to_quicktime(test_video, ASSET_ID)